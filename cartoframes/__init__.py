@@ -1,7 +1,8 @@
 from ._version import __version__
 from .utils.utils import check_package
 from .io.carto import read_carto, to_carto, list_tables, has_table, delete_table, rename_table, \
-                      copy_table, create_table_from_query, describe_table, update_privacy_table
+                      copy_table, create_table_from_query, describe_table, update_privacy_table, \
+                      estimate_upload_size
 
 
 # Check installed packages versions
@@ -21,5 +22,6 @@ __all__ = [
     'copy_table',
     'create_table_from_query',
     'describe_table',
-    'update_privacy_table'
+    'update_privacy_table',
+    'estimate_upload_size'
 ]
@@ -1,29 +1,42 @@
 """Functions to interact with the CARTO platform"""
 import math
+import hashlib
 
-from pandas import DataFrame
+import numpy as np
+
+from pandas import DataFrame, Series
+from pandas.util import hash_pandas_object
 from geopandas import GeoDataFrame
+from geopandas.array import to_wkb
 
 from carto.exceptions import CartoException
 
-from .managers.context_manager import ContextManager, _compute_copy_data, get_dataframe_columns_info
-from ..utils.geom_utils import is_reprojection_needed, reproject, has_geometry, set_geometry
+from .managers.checkpoint_manager import CheckpointManager
+from .managers.context_manager import ContextManager, _encode_copy_column, get_dataframe_columns_info, \
+                                     DEFAULT_PARTITION_COLUMN, DEFAULT_COMPRESSION_LEVEL, GEOM_X_SUFFIX, \
+                                     GEOM_Y_SUFFIX, DEFAULT_MAX_IN_FLIGHT
+from ..utils.geom_utils import has_geometry, set_geometry, decode_geometry_wkb, \
+                               decode_geometry_wkt, decode_geometry_xy, set_lazy_geometry
 from ..utils.logger import log
-from ..utils.utils import is_valid_str, is_sql_query
+from ..utils.utils import is_valid_str, is_sql_query, PG_NULL
 from ..utils.metrics import send_metrics
 
 
 GEOM_COLUMN_NAME = 'the_geom'
 IF_EXISTS_OPTIONS = ['fail', 'replace', 'append']
+UPLOAD_IF_EXISTS_OPTIONS = IF_EXISTS_OPTIONS + ['upsert']
 
 MAX_UPLOAD_SIZE_BYTES = 2000000000  # 2GB
 SAMPLE_ROWS_NUMBER = 100
 CSV_TO_CARTO_RATIO = 1.4
+FINGERPRINT_BATCH_ROWS = 100000
 
 
 @send_metrics('data_downloaded')
 def read_carto(source, credentials=None, limit=None, retry_times=3, schema=None, index_col=None, decode_geom=True,
-               null_geom_value=None):
+               null_geom_value=None, use_nullable_dtypes=False, chunksize=None, parallelism=1,
+               partition_column=DEFAULT_PARTITION_COLUMN, copy_format='csv', geom_format='ewkb', columns=None,
+               where=None, cache=False, engine='pandas', lazy_geom=False):
     """Read a table or a SQL query from the CARTO account.
 
     Args:
@@ -40,12 +53,55 @@ def read_carto(source, credentials=None, limit=None, retry_times=3, schema=None,
         decode_geom (bool, optional): convert the "the_geom" column into a valid geometry column.
         null_geom_value (Object, optional): value for the `the_geom` column when it's null.
             Defaults to None
+        use_nullable_dtypes (bool, optional): parse the columns using the pandas nullable dtypes
+            (`Int64`, `boolean`) based on the column types of the source. It is faster for big
+            tables because the values are not converted one by one. Default is False.
+        chunksize (int, optional): number of rows of each chunk. If provided, the data is streamed
+            and an iterator of GeoDataFrames is returned, so big tables can be processed with
+            bounded memory. Default is to download all rows in one GeoDataFrame.
+        parallelism (int, optional): number of concurrent downloads. If greater than 1, the data
+            is split in ranges of the `partition_column` values and each range is downloaded in
+            a different stream. It can not be used together with `chunksize`, and it is ignored
+            when `limit` is provided. Default is 1.
+        partition_column (str, optional): numeric column used to split the data when `parallelism`
+            is greater than 1. Default is "cartodb_id".
+        copy_format (str, optional): 'csv', 'binary'. Format used to transfer the data. The 'binary'
+            format avoids formatting and parsing the values as text, which is faster for tables
+            with many numeric columns. It can not be used together with `chunksize`. Default is 'csv'.
+        geom_format (str, optional): 'ewkb', 'wkb', 'wkt', 'xy'. Encoding used to transfer the
+            "the_geom" column. The 'wkb' and 'wkt' encodings are decoded in bulk instead of
+            detecting the encoding of the values. The 'xy' encoding transfers only the coordinates
+            of point geometries, which is the cheapest to transfer and decode. Default is 'ewkb'.
+        columns (list of str, optional): names of the columns to download. The projection is done
+            in the COPY query, so the rest of the columns are not transferred. Default is to
+            download all the columns.
+        where (str, optional): SQL condition to filter the rows in the COPY query,
+            e.g. "pop > 1000". Default is to download all the rows.
+        cache (bool, optional): store the downloaded data in a local cache and reuse it while
+            the tables of the source are not updated. The cache is stored in the user cache
+            directory and the least recently used entries are removed when it exceeds 1GB.
+            It can not be used together with `chunksize`. Default is False.
+        engine (str, optional): 'pandas', 'arrow'. With the 'arrow' engine the CSV stream is parsed
+            by pyarrow into a pyarrow.Table, without building a DataFrame. The geometry columns are
+            stored as WKB binary columns with GeoArrow metadata (the 'ewkb' `geom_format` is sent as
+            WKB), and `index_col`, `decode_geom` and `null_geom_value` are ignored. Use :py:func:`arrow_to_geodataframe
+            <cartoframes.utils.arrow_to_geodataframe>` to convert the table when needed. It requires
+            the pyarrow package and it can not be used with `chunksize` or the binary `copy_format`.
+            Default is 'pandas'.
+        lazy_geom (bool, optional): keep the "the_geom" column encoded (as WKB bytes for the WKB
+            `geom_format`) and decode it the first time the geometry is accessed, so the attribute
+            columns can be used without decoding the geometries. A :py:class:`LazyGeoDataFrame
+            <cartoframes.utils.geom_utils.LazyGeoDataFrame>` is returned, and its slices only decode
+            their own rows. It requires `decode_geom` and it is ignored with the 'xy' `geom_format`.
+            Default is False.
 
     Returns:
-        geopandas.GeoDataFrame
+        geopandas.GeoDataFrame, an iterator of geopandas.GeoDataFrame if `chunksize` is provided,
+        or a pyarrow.Table with the 'arrow' `engine`.
 
     Raises:
-        ValueError: if the source is not a valid table_name or SQL query.
+        ValueError: if the source is not a valid table_name or SQL query, or if any of the
+            columns does not exist.
 
     """
     if not is_valid_str(source):
@@ -53,9 +109,28 @@ def read_carto(source, credentials=None, limit=None, retry_times=3, schema=None,
 
     context_manager = ContextManager(credentials)
 
-    df = context_manager.copy_to(source, schema, limit, retry_times)
+    df = context_manager.copy_to(source, schema, limit, retry_times, use_nullable_dtypes=use_nullable_dtypes,
+                                 chunksize=chunksize, parallelism=parallelism, partition_column=partition_column,
+                                 copy_format=copy_format, geom_format=geom_format, columns=columns, where=where,
+                                 cache=cache, engine=engine)
+    log.debug('read_carto: {} round trips, {:.2f}s throttled by the rate limit'.format(
+        context_manager.round_trips, context_manager.rate_limiter.get_stats()['throttled_time']))
+
+    if engine == 'arrow':
+        return df
+
+    if chunksize is not None:
+        return (_prepare_gdf(chunk, index_col, decode_geom, null_geom_value, geom_format, lazy_geom) for chunk in df)
 
-    gdf = GeoDataFrame(df, crs='epsg:4326')
+    return _prepare_gdf(df, index_col, decode_geom, null_geom_value, geom_format, lazy_geom)
+
+
+def _prepare_gdf(df, index_col, decode_geom, null_geom_value, geom_format='ewkb', lazy_geom=False):
+    lazy_geom = decode_geom and lazy_geom and geom_format != 'xy' and GEOM_COLUMN_NAME in df
+    if lazy_geom:
+        gdf = set_lazy_geometry(df, GEOM_COLUMN_NAME, crs='epsg:4326', null_geom_value=null_geom_value)
+    else:
+        gdf = GeoDataFrame(df, crs='epsg:4326')
 
     if index_col:
         if index_col in gdf:
@@ -63,9 +138,24 @@ def read_carto(source, credentials=None, limit=None, retry_times=3, schema=None,
         else:
             gdf.index.name = index_col
 
-    if decode_geom and GEOM_COLUMN_NAME in gdf:
+    geom_x = GEOM_COLUMN_NAME + GEOM_X_SUFFIX
+    geom_y = GEOM_COLUMN_NAME + GEOM_Y_SUFFIX
+    if decode_geom and geom_format == 'xy' and geom_x in gdf and geom_y in gdf:
+        # Build the geometry column from the coordinates
+        gdf.insert(gdf.columns.get_loc(geom_x), GEOM_COLUMN_NAME, decode_geometry_xy(gdf[geom_x], gdf[geom_y]))
+        del gdf[geom_x]
+        del gdf[geom_y]
+
+    if decode_geom and not lazy_geom and GEOM_COLUMN_NAME in gdf:
         # Decode geometry column
-        set_geometry(gdf, GEOM_COLUMN_NAME, inplace=True)
+        if geom_format in ['wkb', 'wkt', 'xy']:
+            if geom_format == 'wkb':
+                gdf[GEOM_COLUMN_NAME] = decode_geometry_wkb(gdf[GEOM_COLUMN_NAME])
+            elif geom_format == 'wkt':
+                gdf[GEOM_COLUMN_NAME] = decode_geometry_wkt(gdf[GEOM_COLUMN_NAME])
+            gdf.set_geometry(GEOM_COLUMN_NAME, inplace=True)
+        else:
+            set_geometry(gdf, GEOM_COLUMN_NAME, inplace=True)
 
         if null_geom_value is not None:
             gdf[GEOM_COLUMN_NAME].fillna(null_geom_value, inplace=True)
@@ -76,15 +166,23 @@ def read_carto(source, credentials=None, limit=None, retry_times=3, schema=None,
 @send_metrics('data_uploaded')
 def to_carto(dataframe, table_name, credentials=None, if_exists='fail', geom_col=None, index=False, index_label=None,
              cartodbfy=True, log_enabled=True, retry_times=3, max_upload_size=MAX_UPLOAD_SIZE_BYTES,
-             skip_quota_warning=False):
+             skip_quota_warning=False, compress=True, compression_level=DEFAULT_COMPRESSION_LEVEL, parallelism=1,
+             encode_workers=0, max_in_flight=DEFAULT_MAX_IN_FLIGHT, upsert_key=None, defer_cartodbfy=False,
+             resume=False):
     """Upload a DataFrame to CARTO. The geometry's CRS must be WGS 84 (EPSG:4326) so you can use it on CARTO.
 
+    The columns of the dataframe are not copied, so the peak memory of the upload is roughly the
+    size of the dataframe plus the buffer of the block being encoded. Geometries in other CRS are
+    reprojected to EPSG:4326 while they are encoded.
+
     Args:
         dataframe (pandas.DataFrame, geopandas.GeoDataFrame`): data to be uploaded.
         table_name (str): name of the table to upload the data.
         credentials (:py:class:`Credentials <cartoframes.auth.Credentials>`, optional):
             instance of Credentials (username, api_key, etc).
-        if_exists (str, optional): 'fail', 'replace', 'append'. Default is 'fail'.
+        if_exists (str, optional): 'fail', 'replace', 'append', 'upsert'. With 'upsert', the rows are
+            loaded into a staging table and merged into the table by the `upsert_key` column: the rows
+            with a new key are inserted and the rows with changed values are updated. Default is 'fail'.
         geom_col (str, optional): name of the geometry column of the dataframe.
         index (bool, optional): write the index in the table. Default is False.
         index_label (str, optional): name of the index column in the table. By default it
@@ -99,6 +197,32 @@ def to_carto(dataframe, table_name, credentials=None, if_exists='fail', geom_col
         skip_quota_warning (bool, optional): skip the quota exceeded check and force the upload.
             (The upload will still fail if the size of the dataset exceeds the remaining DB quota).
             Default is False.
+        compress (bool, optional): compress the data with gzip while it is uploaded. Default is True.
+        compression_level (int, optional): gzip compression level, from 1 (fastest) to 9 (smallest).
+            Default is 1.
+        parallelism (int, optional): number of concurrent uploads. If greater than 1, the table is
+            created once, the rows are split in disjoint ranges uploaded through concurrent connections,
+            and the table is converted to CARTO format at the end. Default is 1.
+        encode_workers (int, optional): number of worker processes used to encode the data while
+            the encoded blocks are uploaded, so the encoding and the transfer overlap.
+            It can not be used with `parallelism` greater than 1.
+            Default is 0, which encodes the data in the uploading thread.
+        max_in_flight (int, optional): maximum number of blocks of 10000 rows encoded ahead of
+            the upload when `encode_workers` is greater than 0. Default is 4.
+        upsert_key (str, optional): name of the column with the unique key of the rows, required
+            when `if_exists` is 'upsert'. Its values must be unique in the dataframe. If the table has
+            no primary key, unique constraint or unique index on this column, a unique index is created
+            on it, which is kept in the table after the upload.
+        defer_cartodbfy (bool, optional): create the table as a plain table, load all the chunks and
+            then convert the table to CARTO format in a single batch job, so the rows are loaded
+            without maintaining the CARTO triggers and indexes. A table appended to is not converted
+            again. If the load fails, the table is dropped if it was created by the upload, but an
+            existing table keeps the rows already loaded. It is always done when `parallelism`
+            is greater than 1. Default is False.
+        resume (bool, optional): record the chunks committed in the table in a local checkpoint,
+            so if the upload fails, running it again with the same dataframe and table skips the
+            chunks already uploaded. The checkpoint is removed when the upload finishes. It can only
+            be used with the sequential upload of chunks. Default is False.
 
     Returns:
         string: the table name normalized.
@@ -110,33 +234,38 @@ def to_carto(dataframe, table_name, credentials=None, if_exists='fail', geom_col
     if not isinstance(dataframe, DataFrame):
         raise ValueError('Wrong dataframe. You should provide a valid DataFrame instance.')
 
-    if isinstance(dataframe, GeoDataFrame):
-        if is_reprojection_needed(dataframe):
-            dataframe = reproject(dataframe)
-
     if not is_valid_str(table_name):
         raise ValueError('Wrong table name. You should provide a valid table name.')
 
-    if if_exists not in IF_EXISTS_OPTIONS:
+    if if_exists not in UPLOAD_IF_EXISTS_OPTIONS:
         raise ValueError('Wrong option for the `if_exists` param. You should provide: {}.'.format(
-            ', '.join(IF_EXISTS_OPTIONS)))
+            ', '.join(UPLOAD_IF_EXISTS_OPTIONS)))
 
-    context_manager = ContextManager(credentials)
+    if if_exists == 'upsert' and not is_valid_str(upsert_key):
+        raise ValueError('`upsert_key` parameter is required when `if_exists` is "upsert"')
 
-    if not skip_quota_warning:
-        me_data = context_manager.credentials.me_data
-        if me_data is not None and me_data.get('user_data'):
-            n = min(SAMPLE_ROWS_NUMBER, len(dataframe))
-            estimated_byte_size = len(dataframe.sample(n=n).to_csv(header=False)) * len(dataframe) \
-                / n / CSV_TO_CARTO_RATIO
-            remaining_byte_quota = me_data.get('user_data').get('remaining_byte_quota')
+    if not (isinstance(parallelism, int) and parallelism > 0):
+        raise ValueError('`parallelism` parameter must be an integer > 0')
 
-            if remaining_byte_quota is not None and estimated_byte_size > remaining_byte_quota:
-                raise CartoException('DB Quota will be exceeded. '
-                                     'The remaining quota is {} bytes and the dataset size is {} bytes.'.format(
-                                        remaining_byte_quota, estimated_byte_size))
+    if not (isinstance(encode_workers, int) and encode_workers >= 0):
+        raise ValueError('`encode_workers` parameter must be an integer >= 0')
+
+    if not (isinstance(max_in_flight, int) and max_in_flight > 0):
+        raise ValueError('`max_in_flight` parameter must be an integer > 0')
+
+    if encode_workers > 0 and parallelism > 1:
+        # Each upload thread would start its own pool of worker processes
+        raise ValueError('`encode_workers` parameter can not be used with `parallelism` > 1')
+
+    if resume and (if_exists == 'upsert' or parallelism > 1 or defer_cartodbfy):
+        raise ValueError('`resume` parameter can not be used with the "upsert" `if_exists`, '
+                         '`parallelism` or `defer_cartodbfy` parameters')
+
+    context_manager = ContextManager(credentials)
 
-    gdf = GeoDataFrame(dataframe, copy=True)
+    # Shallow copy: the columns are shared with the dataframe and the changes below
+    # add or replace columns in the copy without modifying the dataframe
+    gdf = GeoDataFrame(dataframe.copy(deep=False))
 
     if index:
         index_name = index_label or gdf.index.name
@@ -161,14 +290,61 @@ def to_carto(dataframe, table_name, credentials=None, if_exists='fail', geom_col
     elif isinstance(dataframe, GeoDataFrame):
         log.warning('Geometry column not found in the GeoDataFrame.')
 
-    chunk_count = math.ceil(estimate_csv_size(gdf) / max_upload_size)
+    upload_size = estimate_upload_size(gdf)
+
+    if not skip_quota_warning:
+        me_data = context_manager.credentials.me_data
+        if me_data is not None and me_data.get('user_data'):
+            estimated_byte_size = upload_size / CSV_TO_CARTO_RATIO
+            remaining_byte_quota = me_data.get('user_data').get('remaining_byte_quota')
+
+            if remaining_byte_quota is not None and estimated_byte_size > remaining_byte_quota:
+                raise CartoException('DB Quota will be exceeded. '
+                                     'The remaining quota is {} bytes and the dataset size is {} bytes.'.format(
+                                        remaining_byte_quota, estimated_byte_size))
+
+    chunk_count = max(math.ceil(upload_size / max_upload_size), 1)
     chunk_row_size = int(math.ceil(len(gdf) / chunk_count))
-    chunked_gdf = [gdf[i:i + chunk_row_size] for i in range(0, gdf.shape[0], chunk_row_size)]
 
-    for i, chunk in enumerate(chunked_gdf):
-        if i > 0:
-            if_exists = 'append'
-        table_name = context_manager.copy_from(chunk, table_name, if_exists, cartodbfy, retry_times)
+    if if_exists == 'upsert':
+        table_name = context_manager.upsert_from(gdf, table_name, upsert_key, cartodbfy, retry_times,
+                                                 compress, compression_level, parallelism, chunk_row_size,
+                                                 encode_workers, max_in_flight)
+    elif parallelism > 1 or defer_cartodbfy:
+        table_name = context_manager.bulk_copy_from(gdf, table_name, if_exists, cartodbfy, retry_times,
+                                                    compress, compression_level, parallelism, chunk_row_size,
+                                                    encode_workers, max_in_flight)
+    else:
+        chunked_gdf = [gdf[i:i + chunk_row_size] for i in range(0, gdf.shape[0], chunk_row_size)]
+
+        if resume:
+            table_name = context_manager.normalize_table_name(table_name)
+            checkpoint_manager = CheckpointManager()
+            checkpoint_key = checkpoint_manager.get_key(
+                context_manager.credentials.base_url, table_name, _get_fingerprint(gdf))
+            checkpoint_row_size, committed_chunks = checkpoint_manager.read(checkpoint_key)
+            if checkpoint_row_size is not None and checkpoint_row_size != chunk_row_size:
+                # The chunks of the checkpoint are reused, because the estimated size may change
+                chunk_row_size = checkpoint_row_size
+                chunked_gdf = [gdf[i:i + chunk_row_size] for i in range(0, gdf.shape[0], chunk_row_size)]
+
+        for i, chunk in enumerate(chunked_gdf):
+            if i > 0:
+                if_exists = 'append'
+            if resume and i in committed_chunks:
+                log.debug('Skipping chunk {} already uploaded'.format(i))
+                continue
+            table_name = context_manager.copy_from(chunk, table_name, if_exists, cartodbfy, retry_times,
+                                                   compress, compression_level, encode_workers, max_in_flight)
+            if resume:
+                committed_chunks.add(i)
+                checkpoint_manager.write(checkpoint_key, chunk_row_size, committed_chunks)
+
+        if resume:
+            checkpoint_manager.remove(checkpoint_key)
+
+    log.debug('to_carto: {} round trips, {:.2f}s throttled by the rate limit'.format(
+        context_manager.round_trips, context_manager.rate_limiter.get_stats()['throttled_time']))
 
     if log_enabled:
         log.info('Success! Data uploaded to table "{}" correctly'.format(table_name))
@@ -407,8 +583,70 @@ def update_privacy_table(table_name, privacy, credentials=None, log_enabled=True
         log.info('Success! Table "{}" privacy updated correctly'.format(table_name))
 
 
-def estimate_csv_size(gdf):
-    n = min(SAMPLE_ROWS_NUMBER, len(gdf))
-    columns = get_dataframe_columns_info(gdf)
-    return sum([len(x) for x in
-                _compute_copy_data(gdf.sample(n=n), columns)]) * len(gdf) / n
+def estimate_upload_size(dataframe):
+    """Estimate the size in bytes of the data sent by :py:func:`to_carto
+    <cartoframes.to_carto>` to upload a DataFrame, without encoding it.
+
+    The widths of the integer and boolean columns are computed for all the rows,
+    and the widths of the rest of the columns are averaged over a sample of rows.
+    The geometries are measured by their WKB size.
+
+    Args:
+        dataframe (pandas.DataFrame, geopandas.GeoDataFrame): data to be uploaded.
+
+    Returns:
+        float: the estimated size in bytes.
+
+    """
+    row_count = len(dataframe)
+    columns = get_dataframe_columns_info(dataframe)
+    if row_count == 0 or not columns:
+        return 0
+
+    # The sample is taken column by column, because sampling the DataFrame
+    # consolidates its blocks, copying the columns with the same dtype
+    positions = np.random.choice(row_count, min(SAMPLE_ROWS_NUMBER, row_count), replace=False)
+
+    # One delimiter or line break per value
+    size = row_count * len(columns)
+    for column in columns:
+        values = dataframe[column.name].values
+        if column.is_geom:
+            size += _geometries_mean_size(dataframe[column.name].take(positions)) * row_count
+        elif isinstance(values, np.ndarray) and values.dtype.kind in 'iu':
+            size += _integers_size(values)
+        elif isinstance(values, np.ndarray) and values.dtype.kind == 'b':
+            true_count = np.count_nonzero(values)
+            size += true_count * len('True') + (row_count - true_count) * len('False')
+        else:
+            sample = dataframe[column.name].take(positions)
+            widths = [len(value.encode('utf-8')) for value in _encode_copy_column(sample, column)]
+            size += sum(widths) / len(widths) * row_count
+
+    return size
+
+
+def _get_fingerprint(gdf):
+    """Hash of the columns and the values of the GeoDataFrame. The values are hashed in
+    blocks of rows, so only the WKB of the geometries of one block is held in memory."""
+    values_hash = hashlib.sha256()
+    for start in range(0, len(gdf), FINGERPRINT_BATCH_ROWS):
+        for name in gdf.columns:
+            series = gdf[name].iloc[start:start + FINGERPRINT_BATCH_ROWS]
+            if series.dtype == 'geometry':
+                series = Series(to_wkb(series.values), dtype=object)
+            values_hash.update(hash_pandas_object(series, index=False).values.tobytes())
+    crs = gdf.crs if has_geometry(gdf) else None
+    return [list(map(str, gdf.columns)), list(map(str, gdf.dtypes)), str(crs), values_hash.hexdigest()]
+
+
+def _integers_size(values):
+    magnitudes = np.abs(values.astype('float64'))
+    digits = np.floor(np.log10(np.maximum(magnitudes, 1))) + 1
+    return int(digits.sum()) + np.count_nonzero(values < 0)
+
+
+def _geometries_mean_size(geometries):
+    # EWKB hexadecimal: two characters per WKB byte plus the SRID
+    sizes = [len(PG_NULL) if geom is None else len(geom.wkb) * 2 + 8 for geom in geometries]
+    return sum(sizes) / len(sizes)
@@ -0,0 +1,88 @@
+import os
+import json
+import pickle
+import hashlib
+
+import pandas as pd
+
+from ...utils.logger import log
+from ...utils.utils import USER_CACHE_DIR
+
+DEFAULT_CACHE_MAX_SIZE = 1000000000  # 1GB
+CACHE_FILE_EXTENSION = '.pkl'
+
+
+class CacheManager:
+    """Local on-disk cache of downloaded DataFrames (or pyarrow Tables).
+
+    The entries are pickle files named after the hash of the request. When the
+    total size exceeds `max_size`, the least recently used entries are removed.
+    """
+
+    def __init__(self, cache_dir=USER_CACHE_DIR, max_size=DEFAULT_CACHE_MAX_SIZE):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+
+    def get_key(self, *parts):
+        content = json.dumps(parts, sort_keys=True, default=str)
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+    def read(self, key):
+        path = self._get_path(key)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            df = pd.read_pickle(path)
+        except Exception:
+            log.debug('Removing unreadable cache entry {}'.format(path))
+            self._remove(path)
+            return None
+
+        # Update the modification time to track the least recently used entries
+        os.utime(path, None)
+        log.debug('Cache hit {}'.format(path))
+        return df
+
+    def write(self, key, df):
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+
+        path = self._get_path(key)
+        tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        log.debug('Cache write {}'.format(path))
+
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for filename in os.listdir(self.cache_dir):
+            if filename.endswith(CACHE_FILE_EXTENSION):
+                path = os.path.join(self.cache_dir, filename)
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            self._remove(path)
+            total_size -= size
+
+    def clear(self):
+        if os.path.exists(self.cache_dir):
+            for filename in os.listdir(self.cache_dir):
+                if filename.endswith(CACHE_FILE_EXTENSION):
+                    self._remove(os.path.join(self.cache_dir, filename))
+
+    def _get_path(self, key):
+        return os.path.join(self.cache_dir, key + CACHE_FILE_EXTENSION)
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,65 @@
+import os
+import json
+import hashlib
+
+from ...utils.logger import log
+from ...utils.utils import USER_CACHE_DIR
+
+DEFAULT_CHECKPOINT_DIR = os.path.join(USER_CACHE_DIR, 'checkpoints')
+CHECKPOINT_FILE_EXTENSION = '.json'
+
+
+class CheckpointManager:
+    """Local on-disk checkpoints of the chunks uploaded by `to_carto`.
+
+    Each checkpoint is a JSON file named after the hash of the upload, with the
+    number of rows of the chunks and the indexes of the chunks that are already
+    committed in the table. The chunk size is stored because it is estimated from
+    a sample of the data, so a new run could split the data in different chunks.
+    """
+
+    def __init__(self, checkpoint_dir=DEFAULT_CHECKPOINT_DIR):
+        self.checkpoint_dir = checkpoint_dir
+
+    def get_key(self, *parts):
+        content = json.dumps(parts, sort_keys=True, default=str)
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+    def read(self, key):
+        """Return the chunk size and the set of committed chunks of the checkpoint,
+        or (None, empty set) if there is no checkpoint."""
+        path = self._get_path(key)
+        if not os.path.exists(path):
+            return None, set()
+
+        try:
+            with open(path) as f:
+                checkpoint = json.load(f)
+            chunk_row_size = int(checkpoint['chunk_row_size'])
+            chunks = set(checkpoint['chunks'])
+        except Exception:
+            log.debug('Removing unreadable checkpoint {}'.format(path))
+            self.remove(key)
+            return None, set()
+
+        log.debug('Checkpoint read {}: {} chunks of {} rows committed'.format(path, len(chunks), chunk_row_size))
+        return chunk_row_size, chunks
+
+    def write(self, key, chunk_row_size, chunks):
+        if not os.path.exists(self.checkpoint_dir):
+            os.makedirs(self.checkpoint_dir)
+
+        path = self._get_path(key)
+        tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+        with open(tmp_path, 'w') as f:
+            json.dump({'chunk_row_size': chunk_row_size, 'chunks': sorted(chunks)}, f)
+        os.replace(tmp_path, path)
+
+    def remove(self, key):
+        try:
+            os.remove(self._get_path(key))
+        except OSError:
+            pass
+
+    def _get_path(self, key):
+        return os.path.join(self.checkpoint_dir, key + CHECKPOINT_FILE_EXTENSION)
@@ -1,8 +1,15 @@
+import math
 import time
+import uuid
+import inspect
+import threading
 
+import numpy as np
 import pandas as pd
 
 from warnings import warn
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 
 from carto.auth import APIKeyAuthClient
 from carto.datasets import DatasetManager
@@ -10,21 +17,45 @@ from carto.exceptions import CartoException, CartoRateLimitException
 from carto.sql import SQLClient, BatchSQLClient, CopySQLClient
 from pyrestcli.exceptions import NotFoundException
 
+from .cache_manager import CacheManager
+from .rate_limiter import get_rate_limiter
 from ..dataset_info import DatasetInfo
 from ... import __version__
 from ...auth.defaults import get_default_credentials
 from ...utils.logger import log
-from ...utils.geom_utils import encode_geometry_ewkb
-from ...utils.utils import is_sql_query, check_credentials, encode_row, map_geom_type, PG_NULL, double_quote
-from ...utils.columns import (get_dataframe_columns_info, get_query_columns_info, obtain_converters, date_columns_names,
+from ...utils.geom_utils import encode_geometries_ewkb
+from ...utils.arrow_utils import read_copy_arrow
+from ...utils.binary_utils import read_copy_binary, get_binary_cast_type
+from ...utils.utils import is_sql_query, check_credentials, encode_value, map_geom_type, PG_NULL, double_quote
+from ...utils.columns import (ColumnInfo, get_dataframe_columns_info, get_query_columns_info, obtain_converters,
+                              obtain_dtypes, obtain_nullable_dtypes, obtain_na_values, date_columns_names,
                               normalize_name)
 
 DEFAULT_RETRY_TIMES = 3
+DEFAULT_PARTITION_COLUMN = 'cartodb_id'
+DEFAULT_COMPRESSION_LEVEL = 1
+COPY_CHUNK_SIZE = 1048576  # 1MB
+COPY_BATCH_ROWS = 10000
+DEFAULT_MAX_IN_FLIGHT = 4
+COPY_FORMAT_OPTIONS = ['csv', 'binary']
+GEOM_FORMAT_OPTIONS = ['ewkb', 'wkb', 'wkt', 'xy']
+ENGINE_OPTIONS = ['pandas', 'arrow']
+GEOM_X_SUFFIX = '__x'
+GEOM_Y_SUFFIX = '__y'
+SCHEMA_COLUMN_NAME = '__cartoframes_schema'
+
+# Schema of the user of each credentials base_url
+_schemas = {}
 
 
 def retry_copy(func):
+    signature = inspect.signature(func)
+
     def wrapper(*args, **kwargs):
-        m_retry_times = kwargs.get('retry_times', DEFAULT_RETRY_TIMES)
+        m_retry_times = signature.bind(*args, **kwargs).arguments.get('retry_times', DEFAULT_RETRY_TIMES)
+        # The rate limiter of the ContextManager is shared by the concurrent requests
+        rate_limiter = getattr(args[0], 'rate_limiter', None) if args else None
+        attempt = 0
         while m_retry_times >= 1:
             try:
                 return func(*args, **kwargs)
@@ -32,13 +63,18 @@ def retry_copy(func):
                 m_retry_times -= 1
 
                 if m_retry_times <= 0:
-                    warn(('Read call was rate-limited. '
+                    warn(('Copy call was rate-limited. '
                           'This usually happens when there are multiple queries being read at the same time.'))
                     raise err
 
-                warn('Read call rate limited. Waiting {s} seconds'.format(s=err.retry_after))
-                time.sleep(err.retry_after)
-                warn('Retrying...')
+                if rate_limiter is not None:
+                    rate_limiter.penalize(err)
+                    delay = rate_limiter.backoff(attempt, err.retry_after)
+                else:
+                    delay = err.retry_after
+                    time.sleep(delay)
+                attempt += 1
+                log.debug('Copy call rate limited. Retrying after {:.2f} seconds'.format(delay))
         return func(*args, **kwargs)
     return wrapper
 
@@ -68,27 +104,206 @@ class ContextManager:
         self.sql_client = SQLClient(self.auth_client)
         self.copy_client = CopySQLClient(self.auth_client)
         self.batch_sql_client = BatchSQLClient(self.auth_client)
+        self.cache_manager = CacheManager()
+
+        # The requests are paced by the rate limit headers of the responses
+        self.rate_limiter = get_rate_limiter(self.credentials)
+        if self.rate_limiter.update not in self.auth_client.session.hooks['response']:
+            self.auth_client.session.hooks['response'].append(self.rate_limiter.update)
+
+        # Number of requests sent to the SQL API
+        self.round_trips = 0
+        self._round_trips_lock = threading.Lock()
+        self._columns_info = {}
 
     @not_found
     def execute_query(self, query, parse_json=True, do_post=True, format=None, **request_args):
+        self._start_request()
+        if not is_sql_query(query):
+            # The query may modify the tables
+            self._columns_info.clear()
         return self.sql_client.send(query.strip(), parse_json, do_post, format, **request_args)
 
     @not_found
     def execute_long_running_query(self, query):
+        self._start_request()
+        self._columns_info.clear()
         return self.batch_sql_client.create_and_wait_for_completion(query.strip())
 
-    def copy_to(self, source, schema=None, limit=None, retry_times=DEFAULT_RETRY_TIMES):
-        query = self.compute_query(source, schema)
-        columns = self._get_query_columns_info(query)
-        copy_query = self._get_copy_query(query, columns, limit)
-        return self._copy_to(copy_query, columns, retry_times)
+    def copy_to(self, source, schema=None, limit=None, retry_times=DEFAULT_RETRY_TIMES, use_nullable_dtypes=False,
+                chunksize=None, parallelism=1, partition_column=DEFAULT_PARTITION_COLUMN, copy_format='csv',
+                geom_format='ewkb', columns=None, where=None, cache=False, engine='pandas'):
+        if chunksize is not None and not (isinstance(chunksize, int) and chunksize > 0):
+            raise ValueError('`chunksize` parameter must be an integer > 0')
+
+        if copy_format not in COPY_FORMAT_OPTIONS:
+            raise ValueError('Wrong option for the `copy_format` param. You should provide: {}.'.format(
+                ', '.join(COPY_FORMAT_OPTIONS)))
+
+        if geom_format not in GEOM_FORMAT_OPTIONS:
+            raise ValueError('Wrong option for the `geom_format` param. You should provide: {}.'.format(
+                ', '.join(GEOM_FORMAT_OPTIONS)))
+
+        if engine not in ENGINE_OPTIONS:
+            raise ValueError('Wrong option for the `engine` param. You should provide: {}.'.format(
+                ', '.join(ENGINE_OPTIONS)))
+
+        if engine == 'arrow' and (copy_format != 'csv' or chunksize is not None):
+            raise ValueError('The arrow `engine` only supports the csv `copy_format` without `chunksize`')
+
+        if engine == 'arrow' and geom_format == 'ewkb':
+            # GeoArrow WKB columns are ISO WKB, without the SRID of the EWKB
+            geom_format = 'wkb'
+
+        if copy_format == 'binary' and chunksize is not None:
+            raise ValueError('`chunksize` parameter is not supported with the binary `copy_format`')
+
+        if not (isinstance(parallelism, int) and parallelism > 0):
+            raise ValueError('`parallelism` parameter must be an integer > 0')
+
+        if parallelism > 1 and chunksize is not None:
+            raise ValueError('`parallelism` and `chunksize` parameters can not be used together')
+
+        if cache and chunksize is not None:
+            raise ValueError('`cache` and `chunksize` parameters can not be used together')
+
+        query, query_columns = self._compute_query_and_columns(source, schema)
+
+        if columns is not None:
+            query_columns = _select_columns(query_columns, columns)
+
+        cache_key = None
+        if cache:
+            cache_key = self._get_cache_key(query, query_columns, limit, where, use_nullable_dtypes,
+                                            copy_format, geom_format, engine)
+            if cache_key is not None:
+                df = self.cache_manager.read(cache_key)
+                if df is not None:
+                    return df
+
+        if parallelism > 1 and limit is None:
+            df = self._parallel_copy_to(query, query_columns, parallelism, partition_column, retry_times,
+                                        use_nullable_dtypes, copy_format, geom_format, where, engine)
+        else:
+            copy_query = self._get_copy_query(query, query_columns, limit, where, copy_format, geom_format)
+            copy_columns = _get_copy_columns(query_columns, geom_format)
+            df = self._copy_to(copy_query, copy_columns, retry_times, use_nullable_dtypes=use_nullable_dtypes,
+                               chunksize=chunksize, copy_format=copy_format, geom_format=geom_format,
+                               engine=engine)
+
+        if cache_key is not None:
+            self.cache_manager.write(cache_key, df)
+
+        return df
 
     def copy_from(self, gdf, table_name, if_exists='fail', cartodbfy=True,
-                  retry_times=DEFAULT_RETRY_TIMES):
+                  retry_times=DEFAULT_RETRY_TIMES, compress=True, compression_level=DEFAULT_COMPRESSION_LEVEL,
+                  encode_workers=0, max_in_flight=DEFAULT_MAX_IN_FLIGHT):
+        schema = self.get_schema()
+        table_name = self.normalize_table_name(table_name)
+        df_columns = get_dataframe_columns_info(gdf)
+
+        self._prepare_table(table_name, schema, df_columns, if_exists, cartodbfy)
+
+        self._copy_from(gdf, table_name, df_columns, retry_times, compress, compression_level,
+                        encode_workers, max_in_flight)
+        return table_name
+
+    def bulk_copy_from(self, gdf, table_name, if_exists='fail', cartodbfy=True,
+                       retry_times=DEFAULT_RETRY_TIMES, compress=True, compression_level=DEFAULT_COMPRESSION_LEVEL,
+                       parallelism=1, chunk_row_size=None, encode_workers=0, max_in_flight=DEFAULT_MAX_IN_FLIGHT):
         schema = self.get_schema()
         table_name = self.normalize_table_name(table_name)
         df_columns = get_dataframe_columns_info(gdf)
 
+        # The table is created once as a plain table, so the rows are loaded without the
+        # CARTO triggers and indexes, and it is cartodbfied after all the chunks are loaded
+        start = time.time()
+        table_exists = self._prepare_table(table_name, schema, df_columns, if_exists, False)
+        log.debug('Table "{}" prepared in {:.2f}s'.format(table_name, time.time() - start))
+
+        start = time.time()
+        try:
+            self._copy_from_chunks(gdf, table_name, df_columns, parallelism, chunk_row_size, retry_times,
+                                   compress, compression_level, encode_workers, max_in_flight)
+        except Exception:
+            if not table_exists:
+                # A half-loaded plain table is not left behind
+                self._drop_table_after_error(table_name)
+            raise
+        log.debug('Table "{}" loaded in {:.2f}s'.format(table_name, time.time() - start))
+
+        # An existing table is not cartodbfied again when the rows are appended to it
+        if cartodbfy and not (table_exists and if_exists == 'append'):
+            start = time.time()
+            self._cartodbfy_table(table_name, schema)
+            log.debug('Table "{}" cartodbfied in {:.2f}s'.format(table_name, time.time() - start))
+
+        return table_name
+
+    def upsert_from(self, gdf, table_name, key, cartodbfy=True,
+                    retry_times=DEFAULT_RETRY_TIMES, compress=True, compression_level=DEFAULT_COMPRESSION_LEVEL,
+                    parallelism=1, chunk_row_size=None, encode_workers=0, max_in_flight=DEFAULT_MAX_IN_FLIGHT):
+        schema = self.get_schema()
+        table_name = self.normalize_table_name(table_name)
+        df_columns = get_dataframe_columns_info(gdf)
+        key_column = next((column for column in df_columns if column.name == key), None)
+
+        if key_column is None:
+            raise ValueError('Wrong `upsert_key`. The column "{}" does not exist in the dataframe.'.format(key))
+
+        if gdf[key].duplicated().any():
+            # A row can not be updated twice by the same INSERT ... ON CONFLICT DO UPDATE
+            raise ValueError('Wrong `upsert_key`. The column "{}" has duplicated values.'.format(key))
+
+        if not self.has_table(table_name, schema):
+            self._create_table_from_columns(table_name, schema, df_columns, cartodbfy)
+
+        # The rows are loaded into a staging table and merged into the table in a single query
+        staging_table_name = '{}_staging_{}'.format(table_name[:40], uuid.uuid4().hex[:10])
+        self._create_staging_table(staging_table_name, df_columns)
+
+        try:
+            self._copy_from_chunks(gdf, staging_table_name, df_columns, parallelism, chunk_row_size, retry_times,
+                                   compress, compression_level, encode_workers, max_in_flight)
+            self._merge_table(staging_table_name, table_name, schema, df_columns, key_column)
+        finally:
+            try:
+                self.execute_query(_drop_table_query(staging_table_name))
+            except CartoException as e:
+                # The error of the upsert, if any, is not replaced by the error of the cleanup
+                log.warning('Staging table "{}" could not be dropped: {}'.format(staging_table_name, e))
+
+        return table_name
+
+    def _copy_from_chunks(self, gdf, table_name, columns, parallelism, chunk_row_size, retry_times,
+                          compress, compression_level, encode_workers, max_in_flight):
+        row_size = max(int(math.ceil(len(gdf) / parallelism)), 1)
+        if chunk_row_size is not None:
+            row_size = min(row_size, chunk_row_size)
+        chunks = [gdf[i:i + row_size] for i in range(0, len(gdf), row_size)]
+        log.debug('COPY FROM in {} chunks'.format(len(chunks)))
+
+        with ThreadPoolExecutor(max_workers=parallelism) as executor:
+            # Each chunk is a disjoint range of rows retried independently if it is rate-limited
+            futures = [
+                executor.submit(self._copy_from, chunk, table_name, columns, retry_times=retry_times,
+                                compress=compress, compression_level=compression_level,
+                                encode_workers=encode_workers, max_in_flight=max_in_flight)
+                for chunk in chunks
+            ]
+            for future in futures:
+                future.result()
+
+    def _drop_table_after_error(self, table_name):
+        try:
+            self.execute_query(_drop_table_query(table_name))
+        except CartoException as e:
+            log.warning('Table "{}" could not be dropped: {}'.format(table_name, e))
+
+    def _prepare_table(self, table_name, schema, df_columns, if_exists, cartodbfy):
+        """Create, truncate or check the table before the copy.
+        Return whether the table already existed."""
         if self.has_table(table_name, schema):
             if if_exists == 'replace':
                 table_query = self._compute_query_from_table(table_name, schema)
@@ -109,11 +324,10 @@ class ContextManager:
                                     table_name=table_name, schema=schema))
             else:  # 'append'
                 pass
+            return True
         else:
             self._create_table_from_columns(table_name, schema, df_columns, cartodbfy)
-
-        self._copy_from(gdf, table_name, df_columns, retry_times)
-        return table_name
+            return False
 
     def create_table_from_query(self, query, table_name, if_exists, cartodbfy=True):
         schema = self.get_schema()
@@ -190,9 +404,12 @@ class ContextManager:
 
     def get_schema(self):
         """Get user schema from current credentials"""
-        query = 'SELECT current_schema()'
-        result = self.execute_query(query, do_post=False)
-        schema = result['rows'][0]['current_schema']
+        schema = _schemas.get(self.credentials.base_url)
+        if schema is None:
+            query = 'SELECT current_schema()'
+            result = self.execute_query(query, do_post=False)
+            schema = result['rows'][0]['current_schema']
+            _schemas[self.credentials.base_url] = schema
         log.debug('schema: {}'.format(schema))
         return schema
 
@@ -261,6 +478,27 @@ class ContextManager:
             tables = [table.split('.')[1] if '.' in table else table for table in result['rows'][0]['tables']]
         return tables
 
+    def get_query_updated_at(self, query):
+        # Used as the version of the query data in the cache.
+        query = 'SELECT max(updated_at) AS updated_at FROM CDB_QueryTables_Updated_At($q${}$q$)'.format(query)
+        try:
+            result = self.execute_query(query, do_post=False)
+        except CartoException as e:
+            log.debug('Unable to get the last update of the query tables: {}'.format(e))
+            return None
+        if result['total_rows'] > 0:
+            return result['rows'][0]['updated_at']
+
+    def _get_cache_key(self, query, columns, *options):
+        updated_at = self.get_query_updated_at(query)
+        if updated_at is None:
+            # The freshness of the data can not be checked
+            log.debug('The query can not be cached: no tables found')
+            return None
+        return self.cache_manager.get_key(self.credentials.base_url, query,
+                                          [(column.name, column.dbtype) for column in columns],
+                                          updated_at, *options)
+
     def _compare_columns(self, a, b):
         a_copy = [i for i in a if _not_reserved(i.name)]
         b_copy = [i for i in b if _not_reserved(i.name)]
@@ -285,6 +523,26 @@ class ContextManager:
             cartodbfy=_cartodbfy_query(table_name, schema) if cartodbfy else '')
         self.execute_long_running_query(query)
 
+    def _create_staging_table(self, table_name, columns):
+        log.debug('CREATE staging table "{}"'.format(table_name))
+        self.execute_query(_create_table_from_columns_query(table_name, columns, unlogged=True))
+
+    def _merge_table(self, staging_table_name, table_name, schema, columns, key_column):
+        log.debug('MERGE table "{}" into "{}"'.format(staging_table_name, table_name))
+        queries = [_upsert_query(staging_table_name, table_name, columns, key_column)]
+        if not self._has_unique_index(table_name, schema, key_column):
+            # ON CONFLICT requires a unique index on the key, like the primary key of cartodb_id
+            queries.insert(0, _create_unique_index_query(table_name, key_column))
+        self.execute_long_running_query('BEGIN; {}; COMMIT;'.format('; '.join(queries)))
+
+    def _has_unique_index(self, table_name, schema, key_column):
+        result = self.execute_query(_unique_index_query(table_name, schema, key_column))
+        return len(result['rows']) > 0
+
+    def _cartodbfy_table(self, table_name, schema):
+        log.debug('CARTODBFY table "{}"'.format(table_name))
+        self.execute_long_running_query(_cartodbfy_query(table_name, schema))
+
     def _truncate_table(self, table_name, schema, cartodbfy):
         log.debug('TRUNCATE table "{}"'.format(table_name))
         query = 'BEGIN; {truncate}; {cartodbfy}; COMMIT;'.format(
@@ -308,6 +566,29 @@ class ContextManager:
         schema = schema or self.get_schema()
         return self._compute_query_from_table(source, schema)
 
+    def _compute_query_and_columns(self, source, schema=None):
+        if is_sql_query(source) or schema or self.credentials.base_url in _schemas:
+            query = self.compute_query(source, schema)
+            return query, self._get_query_columns_info(query)
+
+        # Get the schema and the columns of the table in one request
+        metadata_query = '''
+            SELECT current_schema() AS {schema_column}, _q.*
+            FROM (SELECT 1) _s LEFT JOIN (SELECT * FROM "{table_name}" LIMIT 0) _q ON true
+        '''.format(schema_column=SCHEMA_COLUMN_NAME, table_name=source)
+        result = self.execute_query(metadata_query, do_post=False)
+
+        schema = result['rows'][0][SCHEMA_COLUMN_NAME]
+        _schemas[self.credentials.base_url] = schema
+        log.debug('schema: {}'.format(schema))
+
+        fields = result['fields'].copy()
+        del fields[SCHEMA_COLUMN_NAME]
+
+        query = self._compute_query_from_table(source, schema)
+        self._columns_info[query] = get_query_columns_info(fields)
+        return query, self._columns_info[query]
+
     def _compute_query_from_table(self, table_name, schema):
         return 'SELECT * FROM "{schema}"."{table_name}"'.format(
             schema=schema or 'public',
@@ -333,20 +614,32 @@ class ContextManager:
         return len(result['rows']) > 0
 
     def _get_query_columns_info(self, query):
-        query = 'SELECT * FROM ({}) _q LIMIT 0'.format(query)
-        table_info = self.execute_query(query)
-        return get_query_columns_info(table_info['fields'])
-
-    def _get_copy_query(self, query, columns, limit):
+        if query not in self._columns_info:
+            columns_query = 'SELECT * FROM ({}) _q LIMIT 0'.format(query)
+            table_info = self.execute_query(columns_query)
+            self._columns_info[query] = get_query_columns_info(table_info['fields'])
+        return self._columns_info[query]
+
+    def _start_request(self):
+        # Wait for the rate limit and count the request
+        self.rate_limiter.acquire()
+        with self._round_trips_lock:
+            self.round_trips += 1
+
+    def _get_copy_query(self, query, columns, limit, where=None, copy_format='csv', geom_format='ewkb'):
         query_columns = [
-            double_quote(column.name) for column in columns
+            expression for column in columns
             if (column.name != 'the_geom_webmercator')
+            for expression in _get_copy_column_expressions(column, copy_format, geom_format)
         ]
 
         query = 'SELECT {columns} FROM ({query}) _q'.format(
             query=query,
             columns=','.join(query_columns))
 
+        if where is not None:
+            query += ' WHERE {where}'.format(where=where)
+
         if limit is not None:
             if isinstance(limit, int) and (limit >= 0):
                 query += ' LIMIT {limit}'.format(limit=limit)
@@ -355,34 +648,111 @@ class ContextManager:
 
         return query
 
+    def _get_partition_predicates(self, query, partition_column, parallelism, where=None):
+        column = double_quote(partition_column)
+        range_query = 'SELECT MIN({column}) AS min, MAX({column}) AS max FROM ({query}) _q'.format(
+            column=column, query=query)
+        if where is not None:
+            range_query += ' WHERE {where}'.format(where=where)
+        result = self.execute_query(range_query, do_post=False)
+        min_value = result['rows'][0]['min']
+        max_value = result['rows'][0]['max']
+
+        if min_value is None or min_value == max_value:
+            return [None]
+
+        if isinstance(min_value, bool) or isinstance(max_value, bool):
+            # bool is a subclass of int, but a boolean column can not be split in ranges
+            log.debug('The partition column "{}" is boolean: COPY TO in a single stream'.format(partition_column))
+            return [None]
+
+        if not isinstance(min_value, (int, float)) or not isinstance(max_value, (int, float)):
+            raise ValueError('The partition column "{}" must be numeric.'.format(partition_column))
+
+        step = (max_value - min_value) / parallelism
+        if isinstance(min_value, int) and isinstance(max_value, int):
+            step = int(math.ceil(step))
+
+        bounds = [min_value + step * i for i in range(1, parallelism)]
+
+        # The first and the last partitions are open, so null values
+        # and rows added after computing the bounds are also copied
+        predicates = ['({column} < {upper} OR {column} IS NULL)'.format(column=column, upper=bounds[0])]
+        for lower, upper in zip(bounds, bounds[1:]):
+            predicates.append('{column} >= {lower} AND {column} < {upper}'.format(
+                column=column, lower=lower, upper=upper))
+        predicates.append('{column} >= {lower}'.format(column=column, lower=bounds[-1]))
+
+        return predicates
+
+    def _parallel_copy_to(self, query, columns, parallelism, partition_column, retry_times, use_nullable_dtypes,
+                          copy_format='csv', geom_format='ewkb', where=None, engine='pandas'):
+        predicates = self._get_partition_predicates(query, partition_column, parallelism, where)
+        copy_queries = [self._get_copy_query(query, columns, None, _and_predicates(where, predicate),
+                                             copy_format, geom_format)
+                        for predicate in predicates]
+        columns = _get_copy_columns(columns, geom_format)
+        log.debug('COPY TO in {} partitions'.format(len(copy_queries)))
+
+        with ThreadPoolExecutor(max_workers=len(copy_queries)) as executor:
+            # Each partition is retried independently if it is rate-limited
+            futures = [
+                executor.submit(self._copy_to, copy_query, columns, retry_times=retry_times,
+                                use_nullable_dtypes=use_nullable_dtypes, copy_format=copy_format,
+                                geom_format=geom_format, engine=engine)
+                for copy_query in copy_queries
+            ]
+            dfs = [future.result() for future in futures]
+
+        if engine == 'arrow':
+            import pyarrow as pa
+            return pa.concat_tables(dfs)
+
+        return pd.concat(dfs, ignore_index=True)
+
     @retry_copy
-    def _copy_to(self, query, columns, retry_times=DEFAULT_RETRY_TIMES):
+    def _copy_to(self, query, columns, retry_times=DEFAULT_RETRY_TIMES, use_nullable_dtypes=False, chunksize=None,
+                 copy_format='csv', geom_format='ewkb', engine='pandas'):
         log.debug('COPY TO')
+        if copy_format == 'binary':
+            copy_query = 'COPY ({0}) TO stdout WITH (FORMAT binary)'.format(query)
+            self._start_request()
+            raw_result = self.copy_client.copyto_stream(copy_query)
+            return read_copy_binary(raw_result.read(), columns, use_nullable_dtypes)
+
         copy_query = "COPY ({0}) TO stdout WITH (FORMAT csv, HEADER true, NULL '{1}')".format(query, PG_NULL)
 
+        # The response compression (gzip, and zstd if the zstandard package is installed)
+        # is negotiated by requests and the stream is decompressed while it is parsed
+
+        self._start_request()
         raw_result = self.copy_client.copyto_stream(copy_query)
 
-        converters = obtain_converters(columns)
-        parse_dates = date_columns_names(columns)
+        if engine == 'arrow':
+            return read_copy_arrow(raw_result, columns, geom_format)
 
-        df = pd.read_csv(
-            raw_result,
-            converters=converters,
-            parse_dates=parse_dates)
-
-        return df
+        return _read_copy_data(raw_result, columns, use_nullable_dtypes, chunksize)
 
     @retry_copy
-    def _copy_from(self, dataframe, table_name, columns, retry_times=DEFAULT_RETRY_TIMES):
+    def _copy_from(self, dataframe, table_name, columns, retry_times=DEFAULT_RETRY_TIMES, compress=True,
+                   compression_level=DEFAULT_COMPRESSION_LEVEL, encode_workers=0, max_in_flight=DEFAULT_MAX_IN_FLIGHT):
         log.debug('COPY FROM')
         query = """
             COPY {table_name}({columns}) FROM stdin WITH (FORMAT csv, DELIMITER '|', NULL '{null}');
         """.format(
             table_name=table_name, null=PG_NULL,
             columns=','.join(double_quote(column.dbname) for column in columns)).strip()
-        data = _compute_copy_data(dataframe, columns)
+        # The rows are sent in blocks, so the data is compressed and
+        # transferred in big chunks instead of one chunk per row
+        if encode_workers > 0:
+            # The rows are encoded by worker processes while the encoded blocks are sent
+            data = _pipeline_copy_data(dataframe, columns, encode_workers, max_in_flight)
+        else:
+            data = _compute_copy_data(dataframe, columns)
+        data = _group_chunks(data, COPY_CHUNK_SIZE)
 
-        self.copy_client.copyfrom(query, data)
+        self._start_request()
+        self.copy_client.copyfrom(query, data, compress, compression_level)
 
     def _rename_table(self, table_name, new_table_name):
         query = _rename_table_query(table_name, new_table_name)
@@ -427,13 +797,56 @@ def _not_reserved(column):
     return column not in RESERVED_COLUMNS
 
 
-def _create_table_from_columns_query(table_name, columns):
+def _create_table_from_columns_query(table_name, columns, unlogged=False):
     columns = ['{name} {type}'.format(name=double_quote(c.dbname), type=c.dbtype) for c in columns]
-    return 'CREATE TABLE {table_name} ({columns})'.format(
+    return 'CREATE {unlogged}TABLE {table_name} ({columns})'.format(
+        unlogged='UNLOGGED ' if unlogged else '',
         table_name=table_name,
         columns=','.join(columns))
 
 
+def _create_unique_index_query(table_name, key_column):
+    return 'CREATE UNIQUE INDEX IF NOT EXISTS {index_name} ON {table_name} ({key})'.format(
+        index_name=double_quote('{}_{}_key'.format(table_name, key_column.dbname)),
+        table_name=table_name,
+        key=double_quote(key_column.dbname))
+
+
+def _unique_index_query(table_name, schema, key_column):
+    # Unique constraints and primary keys are also listed as unique indexes
+    return '''
+        SELECT 1
+        FROM pg_catalog.pg_index i
+        JOIN pg_catalog.pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = i.indkey[0]
+        WHERE i.indrelid = '{schema}.{table_name}'::regclass AND i.indisunique AND i.indnatts = 1
+            AND i.indexprs IS NULL AND i.indpred IS NULL AND a.attname = '{key}';
+    '''.format(
+        schema=double_quote(schema),
+        table_name=table_name,
+        key=key_column.dbname)
+
+
+def _upsert_query(staging_table_name, table_name, columns, key_column):
+    names = [double_quote(c.dbname) for c in columns]
+    update_names = [double_quote(c.dbname) for c in columns if c.dbname != key_column.dbname]
+    if update_names:
+        # Only the rows with changed values are updated
+        conflict = 'DO UPDATE SET {update_columns} ' \
+                   'WHERE ({table_columns}) IS DISTINCT FROM ({excluded_columns})'.format(
+                       update_columns=','.join('{0} = EXCLUDED.{0}'.format(name) for name in update_names),
+                       excluded_columns=','.join('EXCLUDED.' + name for name in update_names),
+                       table_columns=','.join('{}.{}'.format(table_name, name) for name in update_names))
+    else:
+        conflict = 'DO NOTHING'
+    return 'INSERT INTO {table_name} ({columns}) SELECT {columns} FROM {staging_table_name} ' \
+           'ON CONFLICT ({key}) {conflict}'.format(
+               table_name=table_name,
+               staging_table_name=staging_table_name,
+               columns=','.join(names),
+               key=double_quote(key_column.dbname),
+               conflict=conflict)
+
+
 def _create_table_from_query_query(table_name, query):
     return 'CREATE TABLE {table_name} AS ({query})'.format(table_name=table_name, query=query)
 
@@ -462,18 +875,200 @@ def _create_auth_client(credentials, public=False):
         user_agent='cartoframes_{}'.format(__version__))
 
 
-def _compute_copy_data(df, columns):
-    for index in df.index:
-        row_data = []
-        for column in columns:
-            val = df.at[index, column.name]
+def _get_copy_column_expressions(column, copy_format='csv', geom_format='ewkb'):
+    name = double_quote(column.name)
+
+    if column.is_geom:
+        if geom_format == 'wkb':
+            wkb = 'ST_AsBinary({name})'.format(name=name)
+            if copy_format != 'binary':
+                wkb = "encode({wkb}, 'hex')".format(wkb=wkb)
+            return ['{wkb} AS {name}'.format(wkb=wkb, name=name)]
+        if geom_format == 'wkt':
+            return ['ST_AsText({name}) AS {name}'.format(name=name)]
+        if geom_format == 'xy':
+            return [
+                'ST_X({name}) AS {x}'.format(name=name, x=double_quote(column.name + GEOM_X_SUFFIX)),
+                'ST_Y({name}) AS {y}'.format(name=name, y=double_quote(column.name + GEOM_Y_SUFFIX))
+            ]
+        return [name]
+
+    cast_type = get_binary_cast_type(column) if copy_format == 'binary' else None
+    if cast_type is None:
+        return [name]
+    # The types are casted so the binary format of each column is known
+    return ['{name}::{cast_type} AS {name}'.format(name=name, cast_type=cast_type)]
+
+
+def _select_columns(columns, names):
+    columns_by_name = {column.name: column for column in columns}
+    missing_names = [name for name in names if name not in columns_by_name]
+
+    if missing_names:
+        raise ValueError('Wrong columns. The following columns do not exist in the source: {}.'.format(
+            ', '.join(missing_names)))
 
-            if column.is_geom:
-                val = encode_geometry_ewkb(val)
+    return [columns_by_name[name] for name in names]
 
-            row_data.append(encode_row(val))
 
-        csv_row = b'|'.join(row_data)
-        csv_row += b'\n'
+def _and_predicates(*predicates):
+    predicates = [predicate for predicate in predicates if predicate is not None]
+    if len(predicates) < 2:
+        return predicates[0] if predicates else None
+    return ' AND '.join('({})'.format(predicate) for predicate in predicates)
 
-        yield csv_row
+
+def _get_copy_columns(columns, geom_format='ewkb'):
+    """Returns the columns of the COPY query result."""
+    copy_columns = []
+
+    for column in columns:
+        if column.name == 'the_geom_webmercator':
+            continue
+
+        if column.is_geom and geom_format == 'xy':
+            for suffix in [GEOM_X_SUFFIX, GEOM_Y_SUFFIX]:
+                copy_columns.append(ColumnInfo(column.name + suffix, column.dbname + suffix, 'double precision', False))
+        else:
+            copy_columns.append(column)
+
+    return copy_columns
+
+
+def _read_copy_data(raw_result, columns, use_nullable_dtypes=False, chunksize=None):
+    """Parse the CSV data from a COPY TO stream. If `chunksize` is provided,
+    it returns an iterator of DataFrames instead of a single DataFrame.
+    """
+    if use_nullable_dtypes:
+        # Numbers and booleans are parsed natively by the C engine, without per-cell
+        # callbacks, and then casted to the nullable dtypes in a single step
+        read_args = {
+            'dtype': obtain_dtypes(columns),
+            'na_values': obtain_na_values(columns),
+            'keep_default_na': False,
+            'true_values': ['t'],
+            'false_values': ['f']
+        }
+        nullable_dtypes = obtain_nullable_dtypes(columns)
+    else:
+        read_args = {
+            'converters': obtain_converters(columns)
+        }
+        nullable_dtypes = None
+
+    result = pd.read_csv(
+        raw_result,
+        parse_dates=date_columns_names(columns),
+        chunksize=chunksize,
+        **read_args)
+
+    def _cast(df):
+        return df.astype(nullable_dtypes) if nullable_dtypes else df
+
+    if chunksize is None:
+        return _cast(result)
+
+    return (_cast(chunk) for chunk in result)
+
+
+def _group_chunks(chunks, size):
+    group = []
+    group_size = 0
+    for chunk in chunks:
+        group.append(chunk)
+        group_size += len(chunk)
+        if group_size >= size:
+            yield b''.join(group)
+            group = []
+            group_size = 0
+    if group:
+        yield b''.join(group)
+
+
+def _compute_copy_data(df, columns, batch_size=COPY_BATCH_ROWS):
+    """Encode the DataFrame for the COPY FROM query. The values are formatted column by column
+    and each batch of rows is yielded as a single buffer."""
+    for start in range(0, len(df), batch_size):
+        yield _encode_copy_batch(df.iloc[start:start + batch_size], columns)
+
+
+def _pipeline_copy_data(df, columns, workers, max_in_flight, batch_size=COPY_BATCH_ROWS):
+    """Encode the DataFrame for the COPY FROM query in a pool of worker processes.
+    The batches are yielded in order, and at most `max_in_flight` batches are
+    encoded ahead of the consumer, so the memory used by the pipeline is bounded.
+
+    The DataFrame is passed once to each worker when it starts, and only the row
+    ranges are sent with the tasks, because pickling the geometries of each batch
+    costs more than encoding them."""
+    in_flight = deque()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_copy_worker,
+                             initargs=(df, columns)) as executor:
+        try:
+            for start in range(0, len(df), batch_size):
+                if len(in_flight) >= max_in_flight:
+                    yield in_flight.popleft().result()
+                in_flight.append(executor.submit(_encode_copy_worker_batch, start, start + batch_size))
+            while in_flight:
+                yield in_flight.popleft().result()
+        finally:
+            # Pending batches are discarded if the upload fails
+            for future in in_flight:
+                future.cancel()
+
+
+# DataFrame and columns encoded by a COPY FROM worker process
+_copy_worker_data = {}
+
+
+def _init_copy_worker(df, columns):
+    _copy_worker_data['df'] = df
+    _copy_worker_data['columns'] = columns
+
+
+def _encode_copy_worker_batch(start, stop):
+    return _encode_copy_batch(_copy_worker_data['df'].iloc[start:stop], _copy_worker_data['columns'])
+
+
+def _encode_copy_batch(batch, columns):
+    values = [_encode_copy_column(batch[column.name], column) for column in columns]
+    return ('\n'.join(map('|'.join, zip(*values))) + '\n').encode('utf-8')
+
+
+def _encode_copy_column(series, column):
+    """Format the values of a column as `encode_row` does, using vectorized
+    operations for the numeric, boolean and datetime dtypes."""
+    if column.is_geom:
+        return encode_geometries_ewkb(series).fillna(PG_NULL).values
+
+    dtype = series.dtype
+    kind = dtype.kind if hasattr(dtype, 'kind') else 'O'
+
+    if isinstance(dtype, np.dtype) and kind == 'f':
+        series = series.astype('float64')
+        values = series.values
+        text = series.astype(str).values
+        text[np.isnan(values)] = 'NaN'
+        text[np.isposinf(values)] = 'Infinity'
+        text[np.isneginf(values)] = '-Infinity'
+        return text
+
+    if isinstance(dtype, np.dtype) and kind in 'iub':
+        return series.astype(str).values
+
+    if kind in 'iufbmM':
+        # Datetimes and nullable dtypes: missing values are sent as null
+        text = series.astype(str).values
+        text[series.isna().values] = PG_NULL
+        return text
+
+    values = np.asarray(series, dtype=object)
+    if pd.api.types.infer_dtype(values, skipna=False) == 'string':
+        text = pd.Series(values)
+        special = text.str.contains('["|\n]', regex=True).values
+        if special.any():
+            # The values may share the buffer of the column, so a new array is built
+            quoted = '"' + text.str.replace('"', '""', regex=False) + '"'
+            text = text.where(~special, quoted)
+        return text.values
+
+    return [encode_value(value) for value in values]
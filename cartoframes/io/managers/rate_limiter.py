@@ -0,0 +1,137 @@
+import time
+import random
+import threading
+
+from ...utils.logger import log
+
+BACKOFF_BASE = 1  # seconds
+BACKOFF_MAX = 60  # seconds
+DEFAULT_WAIT = 1  # seconds
+
+RATE_LIMIT_LIMIT_HEADER = 'Carto-Rate-Limit-Limit'
+RATE_LIMIT_REMAINING_HEADER = 'Carto-Rate-Limit-Remaining'
+RATE_LIMIT_RESET_HEADER = 'Carto-Rate-Limit-Reset'
+
+# Rate limiter of each credentials
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(credentials):
+    """Return the rate limiter shared by all the requests sent with the credentials."""
+    key = (credentials.base_url, credentials.api_key)
+    with _rate_limiters_lock:
+        if key not in _rate_limiters:
+            _rate_limiters[key] = RateLimiter()
+        return _rate_limiters[key]
+
+
+class RateLimiter:
+    """Token bucket to pace the requests sent to the SQL API with the same credentials.
+
+    The bucket is fed by the rate limit headers of the responses: the capacity is the
+    limit of requests, the tokens are the remaining requests, and the tokens are refilled
+    at the rate needed to reset the limit. The requests are not paced until the first
+    response with these headers is received.
+
+    The time spent waiting for the bucket or backing off after a rate-limited request
+    is accumulated in `throttled_time`.
+    """
+
+    def __init__(self):
+        self.capacity = None
+        self.tokens = None
+        self.refill_rate = None
+        self.blocked_until = 0
+        self.updated_at = time.monotonic()
+
+        self.throttled_time = 0
+        self.throttled_requests = 0
+        self.rate_limited_requests = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Wait until a request can be sent without exceeding the rate limit."""
+        waited = 0
+        waited_without_rate = False
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                delay = self.blocked_until - now
+                if delay <= 0:
+                    if self.tokens is None or self.tokens >= 1:
+                        if self.tokens is not None:
+                            self.tokens -= 1
+                        break
+                    if self.refill_rate:
+                        delay = (1 - self.tokens) / self.refill_rate
+                    elif waited_without_rate:
+                        # Without a refill rate the bucket is only updated by the responses,
+                        # so the request is sent after waiting once instead of waiting forever
+                        break
+                    else:
+                        delay = DEFAULT_WAIT
+                        waited_without_rate = True
+            time.sleep(delay)
+            waited += delay
+
+        if waited > 0:
+            with self._lock:
+                self.throttled_time += waited
+                self.throttled_requests += 1
+            log.debug('Request throttled {:.2f}s by the rate limit'.format(waited))
+
+    def update(self, response, *args, **kwargs):
+        """Update the bucket with the rate limit headers of a response.
+        It can be used as a `requests` response hook."""
+        headers = response.headers
+        if RATE_LIMIT_REMAINING_HEADER not in headers:
+            return
+
+        try:
+            limit = int(headers[RATE_LIMIT_LIMIT_HEADER])
+            remaining = int(headers[RATE_LIMIT_REMAINING_HEADER])
+            reset = int(headers[RATE_LIMIT_RESET_HEADER])
+        except (KeyError, TypeError, ValueError):
+            return
+
+        with self._lock:
+            self._set_limits(limit, remaining, reset)
+
+    def penalize(self, err):
+        """Block the requests after a rate-limited request (CartoRateLimitException)."""
+        with self._lock:
+            self._set_limits(err.limit, err.remaining, err.reset)
+            self.blocked_until = max(self.blocked_until, time.monotonic() + err.retry_after)
+            self.rate_limited_requests += 1
+
+    def backoff(self, attempt, retry_after=0):
+        """Wait before retrying a rate-limited request. The delay grows exponentially with
+        the attempt, with full jitter so the concurrent requests are spread, and it is at
+        least the `Retry-After` of the response."""
+        delay = max(retry_after, random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt)))
+        time.sleep(delay)
+        with self._lock:
+            self.throttled_time += delay
+        return delay
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'throttled_time': self.throttled_time,
+                'throttled_requests': self.throttled_requests,
+                'rate_limited_requests': self.rate_limited_requests
+            }
+
+    def _refill(self, now):
+        if self.tokens is not None and self.refill_rate:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_rate)
+        self.updated_at = now
+
+    def _set_limits(self, limit, remaining, reset):
+        self._refill(time.monotonic())
+        self.capacity = limit
+        self.tokens = remaining
+        if reset > 0 and limit > remaining:
+            self.refill_rate = (limit - remaining) / reset
@@ -1,9 +1,12 @@
 from .logger import set_log_level
-from .geom_utils import decode_geometry
+from .geom_utils import decode_geometry, LazyGeoDataFrame
 from .metrics import setup_metrics
+from .arrow_utils import arrow_to_geodataframe
 
 __all__ = [
     'setup_metrics',
     'set_log_level',
-    'decode_geometry'
+    'decode_geometry',
+    'LazyGeoDataFrame',
+    'arrow_to_geodataframe'
 ]
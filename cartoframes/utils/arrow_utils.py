@@ -0,0 +1,155 @@
+"""Functions to read the COPY TO data into Arrow tables"""
+
+import json
+import binascii
+
+import numpy as np
+
+from pyproj import CRS
+
+from .utils import check_package, PG_NULL
+from .columns import BOOL_DBTYPES, INT_DBTYPES, FLOAT_DBTYPES
+
+GEOARROW_WKB = 'geoarrow.wkb'
+GEOARROW_WKT = 'geoarrow.wkt'
+ARROW_EXTENSION_NAME = b'ARROW:extension:name'
+ARROW_EXTENSION_METADATA = b'ARROW:extension:metadata'
+GEO_METADATA = b'geo'
+GEO_CRS = 'EPSG:4326'
+GEO_PROJJSON = CRS.from_user_input(GEO_CRS).to_json_dict()
+ARROW_BLOCK_SIZE = 1048576  # 1MB
+
+
+def read_copy_arrow(raw_result, columns, geom_format='wkb'):
+    """Parse the CSV result of a COPY TO query in streaming mode into a pyarrow.Table.
+    Geometries are stored as a WKB binary column (WKT for the 'wkt' `geom_format`)
+    with GeoArrow metadata. The WKB geometries must be sent as hexadecimal ISO WKB
+    (`ST_AsBinary`), not EWKB.
+
+    Args:
+        raw_result (file-like): CSV stream of the COPY TO query, with header.
+        columns (list): list of ColumnInfo of the COPY query.
+        geom_format (str, optional): encoding of the geometry columns in the stream. Default is 'wkb'.
+
+    """
+    check_package('pyarrow', is_optional=True)
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+
+    reader = pa_csv.open_csv(
+        raw_result,
+        read_options=pa_csv.ReadOptions(block_size=ARROW_BLOCK_SIZE),
+        convert_options=pa_csv.ConvertOptions(
+            column_types={column.name: _get_arrow_type(column) for column in columns},
+            null_values=[PG_NULL],
+            strings_can_be_null=True,
+            true_values=['t', 'true'],
+            false_values=['f', 'false']))
+    table = pa.Table.from_batches(list(reader), schema=reader.schema)
+
+    geom_columns = [column.name for column in columns if column.is_geom]
+    if geom_format == 'wkt':
+        return _set_geo_metadata(table, geom_columns, GEOARROW_WKT)
+
+    for name in geom_columns:
+        index = table.schema.get_field_index(name)
+        chunks = [_unhexlify_array(chunk) for chunk in table.column(index).chunks]
+        table = table.set_column(index, name, pa.chunked_array(chunks, type=pa.binary()))
+
+    return _set_geo_metadata(table, geom_columns, GEOARROW_WKB)
+
+
+def arrow_to_geodataframe(table):
+    """Convert a pyarrow.Table with GeoArrow WKB or WKT geometry columns into a GeoDataFrame.
+    The primary geometry column of the table is set as the GeoDataFrame geometry.
+
+    Args:
+        table (pyarrow.Table): table returned by `read_carto(..., engine='arrow')`.
+
+    Example:
+        >>> gdf = arrow_to_geodataframe(read_carto('table_name', engine='arrow'))
+
+    """
+    from geopandas import GeoDataFrame
+    from .geom_utils import decode_geometry_wkb, decode_geometry_wkt
+
+    df = table.to_pandas()
+    gdf = GeoDataFrame(df)
+
+    for field in table.schema:
+        extension_name = (field.metadata or {}).get(ARROW_EXTENSION_NAME)
+        if extension_name == GEOARROW_WKB.encode():
+            gdf[field.name] = decode_geometry_wkb(df[field.name])
+        elif extension_name == GEOARROW_WKT.encode():
+            gdf[field.name] = decode_geometry_wkt(df[field.name])
+
+    geo_metadata = (table.schema.metadata or {}).get(GEO_METADATA)
+    if geo_metadata:
+        gdf.set_geometry(json.loads(geo_metadata)['primary_column'], inplace=True, crs=GEO_CRS)
+
+    return gdf
+
+
+def _get_arrow_type(column):
+    import pyarrow as pa
+
+    if column.dbtype in INT_DBTYPES:
+        return pa.int64()
+    if column.dbtype in FLOAT_DBTYPES:
+        return pa.float64()
+    if column.dbtype in BOOL_DBTYPES:
+        return pa.bool_()
+    if column.dbtype == 'date':
+        return pa.date32()
+    if column.dbtype == 'timestamp':
+        return pa.timestamp('us')
+    return pa.string()
+
+
+def _unhexlify_array(array):
+    """Decode a StringArray of hexadecimal values into a BinaryArray with a single
+    unhexlify over the values buffer. The validity bitmap is reused as it is.
+    """
+    import pyarrow as pa
+
+    validity, offsets, data = array.buffers()
+    offsets = np.frombuffer(offsets, dtype=np.int32, count=array.offset + len(array) + 1)
+    values = binascii.unhexlify(memoryview(data)[offsets[0]:offsets[-1]]) if data is not None else b''
+    binary_offsets = (offsets - offsets[0]) // 2
+
+    return pa.Array.from_buffers(
+        pa.binary(), len(array), [validity, pa.py_buffer(binary_offsets), pa.py_buffer(values)],
+        array.null_count, array.offset)
+
+
+def _set_geo_metadata(table, geom_columns, extension_name):
+    import pyarrow as pa
+
+    if not geom_columns:
+        return table
+
+    fields = []
+    for field in table.schema:
+        if field.name in geom_columns:
+            field = field.with_metadata({
+                ARROW_EXTENSION_NAME: extension_name,
+                ARROW_EXTENSION_METADATA: json.dumps({'crs': GEO_PROJJSON})
+            })
+        fields.append(field)
+
+    geo_metadata = {
+        'version': '1.0.0',
+        'primary_column': geom_columns[0],
+        'columns': {
+            name: {
+                'encoding': 'WKB' if extension_name == GEOARROW_WKB else 'WKT',
+                'crs': GEO_PROJJSON,
+                'geometry_types': []
+            } for name in geom_columns
+        }
+    }
+
+    metadata = dict(table.schema.metadata or {})
+    metadata[GEO_METADATA] = json.dumps(geo_metadata)
+
+    return pa.Table.from_arrays(table.columns, schema=pa.schema(fields, metadata=metadata))
@@ -0,0 +1,190 @@
+"""Functions to decode the PostgreSQL binary COPY format"""
+
+import struct
+
+import numpy as np
+import pandas as pd
+
+COPY_SIGNATURE = b'PGCOPY\n\xff\r\n\x00'
+COPY_HEADER_LENGTH = len(COPY_SIGNATURE) + 8
+COPY_TRAILER = b'\xff\xff'
+PG_EPOCH = np.datetime64('2000-01-01T00:00:00', 'us')
+
+# Wire format of the types sent with a fixed width
+FIXED_WIDTH_DTYPES = {
+    'smallint': '>i2',
+    'integer': '>i4',
+    'bigint': '>i8',
+    'real': '>f4',
+    'double precision': '>f8',
+    'boolean': '?',
+    'timestamp': '>i8'
+}
+INT_DTYPES = ['smallint', 'integer', 'bigint']
+FLOAT_DTYPES = ['real', 'double precision']
+
+_unpack_int16 = struct.Struct('>h').unpack_from
+_unpack_int32 = struct.Struct('>i').unpack_from
+
+
+def get_binary_cast_type(column):
+    """Returns the type used to send the column in the binary COPY format.
+    Geometries are not casted, so they are sent as EWKB.
+    """
+    if column.is_geom:
+        return None
+    if column.dbtype in FIXED_WIDTH_DTYPES:
+        return column.dbtype
+    return 'text'
+
+
+def read_copy_binary(data, columns, use_nullable_dtypes=False):
+    """Decode the result of a `COPY ... TO stdout WITH (FORMAT binary)` query
+    into a DataFrame. The columns must be sent using `get_binary_cast_type`.
+
+    Args:
+        data (bytes): binary COPY data.
+        columns (list): list of ColumnInfo of the COPY query.
+        use_nullable_dtypes (bool, optional): use the nullable dtypes `Int64` and `boolean`
+            for integer and boolean columns. Default is False.
+
+    """
+    if not data.startswith(COPY_SIGNATURE):
+        raise ValueError('Wrong binary COPY data: invalid signature.')
+
+    extension_length = _unpack_int32(data, COPY_HEADER_LENGTH - 4)[0]
+    offset = COPY_HEADER_LENGTH + extension_length
+
+    buffers = _read_fixed_width_rows(data, offset, columns)
+    if buffers is None:
+        buffers = _read_rows(data, offset, columns)
+
+    return pd.DataFrame(
+        {column.name: _build_column(column, *buffer, use_nullable_dtypes)
+         for column, buffer in zip(columns, buffers)},
+        columns=[column.name for column in columns])
+
+
+def _read_fixed_width_rows(data, offset, columns):
+    """Vectorized decoding of the tuples when all the columns have a fixed width
+    and there are no null values: every tuple has the same length, so the data
+    can be viewed as a NumPy structured array. Returns None otherwise.
+    """
+    formats = [FIXED_WIDTH_DTYPES.get(get_binary_cast_type(column)) for column in columns]
+    if not formats or None in formats:
+        return None
+
+    fields = [('count', '>i2')]
+    for index, fmt in enumerate(formats):
+        fields += [('length{}'.format(index), '>i4'), ('value{}'.format(index), fmt)]
+    row_dtype = np.dtype(fields)
+
+    body_length = len(data) - offset - len(COPY_TRAILER)
+    if body_length % row_dtype.itemsize != 0 or not data.endswith(COPY_TRAILER):
+        return None
+
+    rows = np.frombuffer(data, dtype=row_dtype, count=body_length // row_dtype.itemsize, offset=offset)
+    if not (rows['count'] == len(columns)).all():
+        return None
+
+    buffers = []
+    for index, fmt in enumerate(formats):
+        if not (rows['length{}'.format(index)] == np.dtype(fmt).itemsize).all():
+            # Null values have a length of -1
+            return None
+        buffers.append((rows['value{}'.format(index)], []))
+
+    return buffers
+
+
+def _read_rows(data, offset, columns):
+    widths = []
+    for column in columns:
+        fmt = FIXED_WIDTH_DTYPES.get(get_binary_cast_type(column))
+        widths.append(np.dtype(fmt).itemsize if fmt else None)
+
+    values = [bytearray() if width else [] for width in widths]
+    nulls = [[] for _ in columns]
+    fields = list(zip(widths, values, nulls))
+
+    row = 0
+    while True:
+        count = _unpack_int16(data, offset)[0]
+        offset += 2
+
+        if count == -1:
+            break
+
+        if count != len(columns):
+            raise ValueError('Wrong binary COPY data: expected {} fields, got {}.'.format(len(columns), count))
+
+        for width, value, null in fields:
+            length = _unpack_int32(data, offset)[0]
+            offset += 4
+
+            if length == -1:
+                null.append(row)
+                if width:
+                    value += bytes(width)
+                else:
+                    value.append(None)
+            else:
+                if width:
+                    value += data[offset:offset + length]
+                else:
+                    value.append(data[offset:offset + length])
+                offset += length
+
+        row += 1
+
+    buffers = []
+    for column, width, value, null in zip(columns, widths, values, nulls):
+        if width:
+            value = np.frombuffer(bytes(value), dtype=FIXED_WIDTH_DTYPES[get_binary_cast_type(column)])
+        buffers.append((value, null))
+
+    return buffers
+
+
+def _build_column(column, values, null_rows, use_nullable_dtypes):
+    dbtype = get_binary_cast_type(column)
+
+    if dbtype is None:
+        # Geometry as EWKB bytes
+        return pd.Series(values, dtype='object')
+
+    if dbtype == 'text':
+        return pd.Series([value.decode('utf-8') if value is not None else None for value in values], dtype='object')
+
+    mask = np.zeros(len(values), dtype=bool)
+    mask[null_rows] = True
+
+    if dbtype in INT_DTYPES:
+        values = values.astype('int64')
+        if use_nullable_dtypes:
+            return pd.arrays.IntegerArray(values, mask)
+        if null_rows:
+            values = values.astype('float64')
+            values[mask] = np.nan
+        return values
+
+    if dbtype in FLOAT_DTYPES:
+        values = values.astype('float64')
+        values[mask] = np.nan
+        return values
+
+    if dbtype == 'boolean':
+        values = values.astype(bool)
+        if use_nullable_dtypes:
+            return pd.arrays.BooleanArray(values, mask)
+        if null_rows:
+            values = values.astype('object')
+            values[mask] = None
+        return values
+
+    if dbtype == 'timestamp':
+        values = (PG_EPOCH + values.astype('int64').astype('timedelta64[us]')).astype('datetime64[ns]')
+        values[mask] = np.datetime64('NaT')
+        return values
+
+    return values
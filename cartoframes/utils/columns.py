@@ -192,6 +192,41 @@ def obtain_converters(columns):
     return converters
 
 
+def obtain_dtypes(columns):
+    dtypes = {}
+
+    for column in columns:
+        if column.dbtype not in INT_DBTYPES + FLOAT_DBTYPES + BOOL_DBTYPES + DATETIME_DBTYPES:
+            dtypes[column.name] = 'object'
+
+    return dtypes
+
+
+def obtain_nullable_dtypes(columns):
+    dtypes = {}
+
+    for column in columns:
+        if column.dbtype in INT_DBTYPES:
+            dtypes[column.name] = 'Int64'
+        elif column.dbtype in BOOL_DBTYPES:
+            dtypes[column.name] = 'boolean'
+
+    return dtypes
+
+
+def obtain_na_values(columns):
+    na_values = {}
+
+    for column in columns:
+        if column.dbtype in FLOAT_DBTYPES:
+            # NaN is not parsed natively as float when the default NA values are disabled
+            na_values[column.name] = [PG_NULL, 'NaN']
+        else:
+            na_values[column.name] = [PG_NULL]
+
+    return na_values
+
+
 def date_columns_names(columns):
     return [x.name for x in columns if x.dbtype in DATETIME_DBTYPES]
 
@@ -1,9 +1,18 @@
 import re
 import json
+import struct
 import shapely
 import binascii as ba
-
+import numpy as np
+import pandas as pd
+
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+from pyproj import CRS, Transformer
+from pandas.api.types import infer_dtype
+from geopandas import _compat as gpd_compat
 from geopandas import GeoSeries, GeoDataFrame, points_from_xy
+from geopandas.array import GeometryArray, GeometryDtype, from_shapely, from_wkb, from_wkt, to_wkb
 
 ENC_SHAPELY = 'shapely'
 ENC_WKB = 'wkb'
@@ -13,9 +22,11 @@ ENC_WKT = 'wkt'
 ENC_EWKT = 'ewkt'
 SPHERICAL_TOLERANCE = 0.0001
 SIMPLIFY_TOLERANCE = 0.001
+PARALLEL_DECODE_MIN_ROWS = 50000
+DETECT_PREFIX_LENGTH = 32
 
 
-def set_geometry(gdf, col, drop=False, inplace=False, crs=None):
+def set_geometry(gdf, col, drop=False, inplace=False, crs=None, n_jobs=1, mixed_encoding=False):
     """Set the GeoDataFrame geometry using either an existing column or the specified input.
     By default yields a new object. The original geometry column is replaced with the input.
     It detects the geometry encoding and it decodes the column if required. Supported geometry
@@ -32,6 +43,11 @@ def set_geometry(gdf, col, drop=False, inplace=False, crs=None):
         inplace (boolean, default False): Modify the GeoDataFrame in place (do not create a new object).
         crs (str/result of fion.get_crs, optional): Coordinate system to use. If passed, overrides both
             DataFrame and col's crs. Otherwise, tries to get crs from passed col values or DataFrame.
+        n_jobs (int, optional): number of worker processes used to decode the geometry. If greater
+            than 1, the column is split in blocks that are decoded in parallel. Small columns are
+            always decoded in the current process. Default is 1.
+        mixed_encoding (boolean, default False): Detect the encoding of each geometry instead of
+            using the encoding of the first one for the whole column.
 
     Example:
         >>> set_geometry(gdf, 'the_geom', drop=True, inplace=True)
@@ -40,6 +56,9 @@ def set_geometry(gdf, col, drop=False, inplace=False, crs=None):
     if not isinstance(gdf, GeoDataFrame):
         raise ValueError('gdf must be an instance of geopandas.GeoDataFrame.')
 
+    if not (isinstance(n_jobs, int) and n_jobs > 0):
+        raise ValueError('`n_jobs` parameter must be an integer > 0')
+
     if inplace:
         frame = gdf
     else:
@@ -49,9 +68,9 @@ def set_geometry(gdf, col, drop=False, inplace=False, crs=None):
     if isinstance(col, str):
         if col not in frame:
             raise Exception('Column "{0}" does not exist.'.format(col))
-        frame[col] = decode_geometry(frame[col].dropna())
+        frame[col] = decode_geometry(frame[col], n_jobs, mixed_encoding)
     else:
-        col = decode_geometry(col.dropna())
+        col = decode_geometry(col, n_jobs, mixed_encoding)
 
     # Call set_geometry with decoded column
     frame.set_geometry(col, drop=drop, inplace=True, crs=crs)
@@ -60,6 +79,84 @@ def set_geometry(gdf, col, drop=False, inplace=False, crs=None):
         return frame
 
 
+def set_lazy_geometry(df, col, crs=None, null_geom_value=None):
+    """Create a LazyGeoDataFrame with an encoded geometry column that is decoded on first access.
+    Hexadecimal WKB geometries are stored as WKB bytes, and the rest of the encodings are stored
+    as they are.
+
+    Args:
+        df (pandas.DataFrame): DataFrame containing the encoded geometry column.
+        col (str): Name of the column containing the encoded geometry.
+        crs (str, optional): Coordinate system of the geometry.
+        null_geom_value (Object, optional): value for the null geometries when they are decoded.
+
+    Example:
+        >>> gdf = set_lazy_geometry(df, 'the_geom', crs='epsg:4326')
+
+    """
+    if col not in df:
+        raise ValueError('Column "{0}" does not exist.'.format(col))
+
+    gdf = LazyGeoDataFrame(df, crs=crs)
+    values = _mask_null_geometries(gdf[col])
+    first_geom = _first_geometry(values)
+    enc_type = detect_encoding_type(first_geom) if first_geom is not None else None
+    if enc_type in (ENC_WKB_HEX, ENC_WKB_BHEX):
+        gdf[col] = pd.Series(_unhexlify_values(values, enc_type), index=gdf.index)
+
+    gdf._geometry_column_name = col
+    gdf._null_geom_value = null_geom_value
+    return gdf
+
+
+class LazyGeoDataFrame(GeoDataFrame):
+    """GeoDataFrame with an encoded geometry column that is decoded on first access.
+
+    The geometry column is kept encoded until it is accessed with `geometry`,
+    `gdf[geometry_column]` or any spatial method, and then it is decoded in place.
+    Slices of a LazyGeoDataFrame are lazy too, so only the geometries of the slice
+    are decoded when they are accessed. The rest of the columns can be used without
+    decoding the geometry.
+
+    Use :py:func:`set_lazy_geometry <cartoframes.utils.geom_utils.set_lazy_geometry>`
+    to create it.
+    """
+
+    _metadata = GeoDataFrame._metadata + ['_null_geom_value']
+
+    _null_geom_value = None
+
+    @property
+    def _constructor(self):
+        return LazyGeoDataFrame
+
+    @property
+    def is_decoded(self):
+        """True if the geometry column has been decoded."""
+        name = self._geometry_column_name
+        return name not in self.columns or isinstance(self.dtypes[name], GeometryDtype)
+
+    def decode(self):
+        """Decode the geometry column in place."""
+        if not self.is_decoded:
+            geom_col = decode_geometry(super().__getitem__(self._geometry_column_name))
+            if self._null_geom_value is not None:
+                geom_col = geom_col.fillna(self._null_geom_value)
+            # The frame may be a slice of another one, which is not modified
+            self._is_copy = None
+            self.set_geometry(geom_col, inplace=True)
+
+    def __getitem__(self, key):
+        if not pd.api.types.is_list_like(key) and key == self._geometry_column_name:
+            self.decode()
+
+        result = super().__getitem__(key)
+        if type(result) is GeoDataFrame:
+            result.__class__ = LazyGeoDataFrame
+            result._null_geom_value = self._null_geom_value
+        return result
+
+
 def set_geometry_from_xy(gdf, x, y, drop=False, inplace=False, crs=None):
     """Set the GeoDataFrame geometry using either existing lng/lat columns or the specified inputs.
     By default yields a new object. The original geometry column is replaced with the new one.
@@ -111,7 +208,7 @@ def has_geometry(gdf):
     return hasattr(gdf, '_geometry_column_name') and gdf._geometry_column_name in gdf
 
 
-def decode_geometry(geom_col):
+def decode_geometry(geom_col, n_jobs=1, mixed_encoding=False):
     """Decodes a DataFrame column. It detects the geometry encoding and it decodes the column if required.
     Supported geometry encodings are:
 
@@ -120,23 +217,163 @@ def decode_geometry(geom_col):
         - `WKT` (String)
         - `Extended WKT` (String)
 
+    The encoding is detected from the first geometry and the whole column is decoded
+    in bulk. Null and empty values are decoded as None in their positions. If the column
+    mixes encodings, use `mixed_encoding` to detect the encoding of each geometry and
+    decode the geometries of each encoding in bulk.
+
     Args:
         geom_col (array): Column containing the encoded geometry.
+        n_jobs (int, optional): number of worker processes used to decode the column.
+            Default is 1.
+        mixed_encoding (boolean, optional): detect the encoding of each geometry.
+            Default is False.
 
     Example:
         >>> decode_geometry(df['the_geom'])
 
     """
     if geom_col.size > 0:
-        enc_type = None
-        if any(geom_col):
-            first_geom = next(item for item in geom_col if item is not None)
-            enc_type = detect_encoding_type(first_geom)
-        return GeoSeries(geom_col.apply(lambda g: decode_geometry_item(g, enc_type)))
+        values = _mask_null_geometries(geom_col)
+
+        if mixed_encoding:
+            values = _decode_mixed_values(values, n_jobs)
+        else:
+            first_geom = _first_geometry(values)
+            enc_type = detect_encoding_type(first_geom) if first_geom is not None else None
+            values = _decode_encoded_values(values, enc_type, n_jobs)
+
+        return GeoSeries(values, index=geom_col.index)
     else:
         return geom_col
 
 
+def decode_geometry_wkb(geom_col):
+    """Decodes a WKB DataFrame column in bulk. The geometries can be
+    bytes or hexadecimal strings. Null values are kept as None.
+
+    Args:
+        geom_col (pandas.Series): Column containing the WKB geometry.
+
+    """
+    values = _mask_null_geometries(geom_col)
+    enc_type = ENC_WKB_HEX if isinstance(_first_geometry(values), str) else ENC_WKB
+    return GeoSeries(_decode_wkb_values(values, enc_type), index=geom_col.index)
+
+
+def decode_geometry_wkt(geom_col):
+    """Decodes a WKT DataFrame column in bulk. Null values are kept as None.
+
+    Args:
+        geom_col (pandas.Series): Column containing the WKT geometry.
+
+    """
+    return GeoSeries(from_wkt(geom_col.values), index=geom_col.index)
+
+
+def decode_geometry_xy(x_col, y_col):
+    """Decodes a pair of coordinate columns into a Point column in bulk.
+    Rows with a null coordinate are decoded as None.
+
+    Args:
+        x_col (pandas.Series): Column containing the x (longitude) coordinates.
+        y_col (pandas.Series): Column containing the y (latitude) coordinates.
+
+    """
+    geom_col = GeoSeries(points_from_xy(x_col, y_col), index=x_col.index)
+    geom_col[x_col.isna() | y_col.isna()] = None
+    return geom_col
+
+
+def _decode_mixed_values(values, n_jobs):
+    """Group the positions of the values by encoding, decode each group in bulk and
+    restore the original order. Values with an unknown encoding are decoded as None."""
+    positions = {}
+    for position, enc_type in enumerate(detect_encoding_types(values)):
+        positions.setdefault(enc_type, []).append(position)
+
+    order = []
+    decoded = []
+    for enc_type, group in positions.items():
+        if enc_type is None:
+            group_values = from_shapely(np.full(len(group), None, dtype=object))
+        else:
+            group_values = _decode_encoded_values(values[group], enc_type, n_jobs)
+            if not isinstance(group_values, GeometryArray):
+                group_values = from_shapely(group_values)
+        order.extend(group)
+        decoded.append(group_values)
+
+    return GeometryArray._concat_same_type(decoded).take(np.argsort(order))
+
+
+def _decode_encoded_values(values, enc_type, n_jobs):
+    if n_jobs > 1 and len(values) >= PARALLEL_DECODE_MIN_ROWS and _is_parallel_decode_supported(enc_type):
+        return _parallel_decode_values(values, enc_type, n_jobs)
+    else:
+        return _decode_values(values, enc_type)
+
+
+def _decode_values(values, enc_type):
+    if enc_type in (ENC_WKB, ENC_WKB_HEX, ENC_WKB_BHEX):
+        return _decode_wkb_values(values, enc_type)
+    elif enc_type == ENC_WKT:
+        return from_wkt(values)
+    elif enc_type == ENC_EWKT:
+        # The SRID prefix is removed from all the values at once
+        return from_wkt(pd.Series(values).str.replace(r'^SRID=\d+;', '', regex=True).values)
+    return values
+
+
+def _is_parallel_decode_supported(enc_type):
+    """The workers return the geometries as WKB, so only the text encodings are
+    decoded in parallel, and only if geopandas decodes WKB in bulk (PyGEOS or
+    Shapely 2). Otherwise decoding the WKB costs as much as decoding the column."""
+    vectorized = getattr(gpd_compat, 'USE_PYGEOS', False) or getattr(gpd_compat, 'USE_SHAPELY_20', False)
+    return vectorized and enc_type in (ENC_WKT, ENC_EWKT)
+
+
+def _parallel_decode_values(values, enc_type, n_jobs):
+    """Decode an object array in blocks in a pool of worker processes.
+    The workers return the geometries as WKB, which is decoded with a
+    single `from_wkb` call in the current process."""
+    blocks = np.array_split(values, n_jobs)
+    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+        wkb_blocks = list(executor.map(_decode_wkb_block, blocks, [enc_type] * len(blocks)))
+    return from_wkb(np.concatenate(wkb_blocks))
+
+
+def _decode_wkb_block(values, enc_type):
+    return to_wkb(_decode_values(values, enc_type))
+
+
+def _mask_null_geometries(geom_col):
+    """Return the values of the column as an object array with the null and empty values as None."""
+    values = np.array(geom_col, dtype=object)
+    mask = pd.isna(values)
+    if not isinstance(geom_col, GeoSeries):
+        mask |= (values == '') | (values == b'')
+    values[mask] = None
+    return values
+
+
+def _first_geometry(values):
+    return next((value for value in values if value is not None), None)
+
+
+def _decode_wkb_values(values, enc_type):
+    """Decode an object array of WKB values with a single `from_wkb` call.
+    The hexadecimal values are converted to bytes first."""
+    if enc_type in (ENC_WKB_HEX, ENC_WKB_BHEX):
+        values = _unhexlify_values(values, enc_type)
+    return from_wkb(values)
+
+
+def _unhexlify_values(values, enc_type):
+    unhexlify = bytes.fromhex if enc_type == ENC_WKB_HEX else ba.unhexlify
+    return np.array([None if value is None else unhexlify(value) for value in values], dtype=object)
+
+
 def detect_encoding_type(input_geom):
     """
     Detect geometry encoding type:
@@ -148,32 +385,130 @@ def detect_encoding_type(input_geom):
     - ENC_EWKB_BHEX: b'0101000020E6100000000000000048934000000000009DB640'
     - ENC_WKT: 'POINT (1234 5789)'
     - ENC_EWKT: 'SRID=4326;POINT (1234 5789)'
+
+    Only the first characters of the geometry are checked: the WKB headers
+    and the EWKT SRID prefix fit in them.
     """
     if isinstance(input_geom, shapely.geometry.base.BaseGeometry):
         return ENC_SHAPELY
 
     if isinstance(input_geom, str):
-        if _is_hex(input_geom):
+        if not input_geom:
+            return None
+        prefix = input_geom[:DETECT_PREFIX_LENGTH]
+        if _is_hex(prefix):
             return ENC_WKB_HEX
-        else:
-            srid, geom = _extract_srid(input_geom)
-            if not geom:
-                return None
-            if srid:
-                return ENC_EWKT
-            else:
-                return ENC_WKT
+        srid_prefix = _SRID_PREFIX_RE.match(prefix)
+        if srid_prefix:
+            return ENC_EWKT if len(input_geom) > srid_prefix.end() else None
+        return ENC_WKT
 
     if isinstance(input_geom, bytes):
-        try:
-            ba.unhexlify(input_geom)
+        if _HEX_BYTES_RE.match(input_geom[:DETECT_PREFIX_LENGTH]):
             return ENC_WKB_BHEX
-        except Exception:
+        else:
             return ENC_WKB
 
     return None
 
 
+def detect_encoding_types(geom_col):
+    """Detect the geometry encoding type of each value of a column.
+    Null values and values with an unknown encoding are detected as None.
+
+    Args:
+        geom_col (array): Column containing the encoded geometry.
+
+    """
+    values = _mask_null_geometries(geom_col)
+    not_null = ~pd.isna(values)
+    inferred_type = infer_dtype(values, skipna=True)
+
+    # The strings and the bytes are classified in bulk by the codes of their first
+    # characters, with the same rules as `detect_encoding_type`
+    if inferred_type == 'string':
+        is_str, is_bytes = not_null, np.zeros(len(values), dtype=bool)
+    elif inferred_type == 'bytes':
+        is_str, is_bytes = np.zeros(len(values), dtype=bool), not_null
+    else:
+        value_types = _get_types(values)
+        is_str, is_bytes = value_types == str, value_types == bytes
+
+    enc_types = np.empty(len(values), dtype=object)
+    if is_str.any():
+        enc_types[is_str] = _ENC_TYPES[_detect_str_encoding_types(values[is_str])]
+    if is_bytes.any():
+        enc_types[is_bytes] = _ENC_TYPES[_detect_bytes_encoding_types(values[is_bytes])]
+
+    if inferred_type not in ('string', 'bytes', 'empty'):
+        # Other values, like shapely geometries, are detected one by one
+        for position in np.flatnonzero(~is_str & ~is_bytes & not_null):
+            enc_types[position] = detect_encoding_type(values[position])
+
+    return enc_types
+
+
+_get_types = np.frompyfunc(type, 1, 1)
+_ENC_TYPES = np.array([None, ENC_WKT, ENC_EWKT, ENC_WKB_HEX, ENC_WKB, ENC_WKB_BHEX], dtype=object)
+_ENC_TYPE_CODES = {enc_type: code for code, enc_type in enumerate(_ENC_TYPES)}
+_SRID_PREFIX_CODES = np.array([ord(char) for char in 'SRID='])
+
+
+def _detect_str_encoding_types(values):
+    """Return the codes in `_ENC_TYPES` of the encodings of an array of strings."""
+    codes, lengths = _get_prefix_codes(values, 'U', np.uint32)
+    enc_types = np.full(len(values), _ENC_TYPE_CODES[ENC_WKT], dtype=np.int8)
+
+    # SRID=<digits>; inside the prefix, followed by the WKT
+    size = len(_SRID_PREFIX_CODES)
+    srid_rows = np.flatnonzero(codes[:, 0] == _SRID_PREFIX_CODES[0])
+    if len(srid_rows) > 0 and codes.shape[1] > size + 1:
+        srid_codes, srid_lengths = codes[srid_rows], lengths[srid_rows]
+        digits = _is_digit_code(srid_codes[:, size:]) & _get_prefix_mask(srid_codes, srid_lengths)[:, size:]
+        end = size + np.argmin(digits, axis=1)
+        is_srid = (srid_codes[:, :size] == _SRID_PREFIX_CODES).all(axis=1) & (end > size) & \
+            ~digits.all(axis=1) & (srid_codes[np.arange(len(srid_rows)), end] == ord(';'))
+        enc_types[srid_rows[is_srid]] = np.where(srid_lengths[is_srid] > end[is_srid] + 1,
+                                                 _ENC_TYPE_CODES[ENC_EWKT], _ENC_TYPE_CODES[None])
+
+    hex_rows = np.flatnonzero(_is_hex_code(codes[:, 0]))
+    enc_types[hex_rows[_is_hex_prefix(codes[hex_rows], lengths[hex_rows])]] = _ENC_TYPE_CODES[ENC_WKB_HEX]
+    return enc_types
+
+
+def _detect_bytes_encoding_types(values):
+    """Return the codes in `_ENC_TYPES` of the encodings of an array of bytes."""
+    codes, lengths = _get_prefix_codes(values, 'S', np.uint8)
+    return np.where(_is_hex_prefix(codes, lengths), _ENC_TYPE_CODES[ENC_WKB_BHEX], _ENC_TYPE_CODES[ENC_WKB])
+
+
+def _get_prefix_codes(values, kind, code_type):
+    """Return the character codes of the first characters of the values in a
+    2D array, and the lengths of the values."""
+    codes = values.astype('{}{}'.format(kind, DETECT_PREFIX_LENGTH)).view(code_type)
+    codes = codes.reshape(len(values), DETECT_PREFIX_LENGTH)
+    return codes, np.fromiter(map(len, values), dtype=np.int64, count=len(values))
+
+
+def _get_prefix_mask(codes, lengths):
+    return np.arange(codes.shape[1]) < lengths[:, np.newaxis]
+
+
+def _is_digit_code(codes):
+    return (codes >= ord('0')) & (codes <= ord('9'))
+
+
+def _is_hex_code(codes):
+    return _HEX_CODES[np.minimum(codes, len(_HEX_CODES) - 1)]
+
+
+_HEX_CODES = np.array([chr(code) in '0123456789abcdefABCDEF' for code in range(128)])
+
+
+def _is_hex_prefix(codes, lengths):
+    return (_is_hex_code(codes) | ~_get_prefix_mask(codes, lengths)).all(axis=1) & (lengths > 0)
+
+
 def decode_geometry_item(geom, enc_type):
     """Decode any geometry into a shapely geometry."""
     if geom:
@@ -223,7 +558,12 @@ def _load_ewkt(egeom):
 
 
 def _is_hex(input_geom):
-    return re.match(r'^[0-9a-fA-F]+$', input_geom)
+    return _HEX_RE.match(input_geom)
+
+
+_HEX_RE = re.compile(r'^[0-9a-fA-F]+$')
+_HEX_BYTES_RE = re.compile(rb'^[0-9a-fA-F]+$')
+_SRID_PREFIX_RE = re.compile(r'^SRID=\d+;')
 
 
 def _extract_srid(egeom):
@@ -245,6 +585,163 @@ def encode_geometry_ewkb(geom, srid=4326):
         return shapely.wkb.dumps(geom, hex=True, include_srid=True)
 
 
+def encode_geometries_ewkb(geom_col, srid=4326):
+    """Encode a geometry column into EWKB hexadecimal strings in bulk.
+    The WKB of the whole column is generated at once and the SRID is
+    added patching the headers, so the geometries are not modified.
+    Null geometries are encoded as None.
+
+    If the CRS of the column is not equivalent to the SRID, the coordinates
+    are reprojected in the WKB buffer while encoding.
+
+    Args:
+        geom_col (geopandas.GeoSeries): Column containing the geometries.
+        srid (int, optional): SRID (EPSG code) of the encoded geometries. Default is 4326.
+
+    """
+    geom_col = GeoSeries(geom_col)
+    if geom_col.crs is not None and not is_crs_equivalent(geom_col.crs, srid):
+        wkb_col = _reproject_wkb_hex(geom_col, srid)
+    else:
+        wkb_col = _to_wkb_hex(geom_col)
+    srid_le = struct.pack('<I', srid).hex().upper()
+    srid_be = struct.pack('>I', srid).hex().upper()
+
+    # The geometry type is an uint32 after the byte order: the SRID flag
+    # is set in its most significant byte and the SRID is added after it
+    return pd.Series([
+        None if wkb is None else
+        wkb[:8] + _SRID_FLAG_BYTES[wkb[8:10]] + srid_le + wkb[10:] if wkb[:2] == '01' else
+        wkb[:2] + _SRID_FLAG_BYTES[wkb[2:4]] + wkb[4:10] + srid_be + wkb[10:]
+        for wkb in wkb_col.values
+    ], index=wkb_col.index, dtype=object)
+
+
+_SRID_FLAG_BYTES = {'{:02X}'.format(byte): '{:02X}'.format(byte | 0x20) for byte in range(256)}
+_SRID_FLAG_BYTES.update({key.lower(): value for key, value in _SRID_FLAG_BYTES.items()})
+
+
+def _reproject_wkb_hex(geom_col, epsg):
+    """Encode a geometry column into WKB hexadecimal strings reprojected to the EPSG code.
+    The coordinates of all the geometries are transformed at once in a single WKB buffer.
+    Big-endian, Z and M geometries are reprojected with `to_crs` before encoding."""
+    values = to_wkb(geom_col.values)
+    try:
+        values = _transform_wkb_values(values, get_transformer(geom_col.crs, epsg))
+    except _UnsupportedWKBError:
+        return _to_wkb_hex(reproject(geom_col, epsg))
+    return _wkb_hex_series(values, geom_col.index)
+
+
+def _to_wkb_hex(geom_col):
+    """Encode a geometry column into WKB hexadecimal strings.
+    `GeoSeries.to_wkb` is not used because it requires geopandas >= 0.9."""
+    return _wkb_hex_series(to_wkb(geom_col.values), geom_col.index)
+
+
+def _wkb_hex_series(values, index):
+    return pd.Series([None if value is None else value.hex().upper() for value in values],
+                     index=index, dtype=object)
+
+
+class _UnsupportedWKBError(Exception):
+    pass
+
+
+_unpack_uint32_le = struct.Struct('<I').unpack_from
+
+
+def _transform_wkb_values(values, transformer):
+    """Transform the coordinates of an object array of little-endian 2D WKB values.
+    The values are joined in one buffer and the coordinate runs of every geometry are
+    located, so the coordinates are read, transformed and written back in bulk."""
+    runs = []
+    offset = 0
+    for value in values:
+        if value is not None:
+            _find_wkb_coordinates(value, 0, offset, runs)
+            offset += len(value)
+
+    buffer = bytearray(b''.join(value for value in values if value is not None))
+
+    if runs:
+        runs = np.array(runs, dtype=np.int64)
+        # The coordinates are read as float64 views of the buffer, which
+        # are only aligned with the runs with the same offset modulo 8
+        for alignment in range(8):
+            aligned_runs = runs[runs[:, 0] % 8 == alignment]
+            if len(aligned_runs) > 0:
+                coords = np.frombuffer(buffer, dtype='<f8', offset=alignment,
+                                       count=(len(buffer) - alignment) // 8)
+                _transform_coordinates(coords, (aligned_runs[:, 0] - alignment) // 8, aligned_runs[:, 1],
+                                       transformer)
+
+    result = np.empty(len(values), dtype=object)
+    offset = 0
+    for index, value in enumerate(values):
+        if value is not None:
+            result[index] = bytes(buffer[offset:offset + len(value)])
+            offset += len(value)
+    return result
+
+
+def _transform_coordinates(coords, starts, sizes, transformer):
+    """Transform in place the runs of (x, y) pairs of a float64 array."""
+    lengths = sizes * 2
+    ends = np.cumsum(lengths)
+    positions = np.repeat(starts - (ends - lengths), lengths) + np.arange(ends[-1] if len(ends) else 0)
+    x_positions = positions[0::2]
+    y_positions = positions[1::2]
+
+    x = coords[x_positions]
+    y = coords[y_positions]
+    # Empty points are encoded with NaN coordinates
+    finite = np.isfinite(x) & np.isfinite(y)
+    x[finite], y[finite] = transformer.transform(x[finite], y[finite])
+    coords[x_positions] = x
+    coords[y_positions] = y
+
+
+def _find_wkb_coordinates(wkb, position, offset, runs):
+    """Append the (buffer offset, number of points) runs of coordinates of the WKB geometry
+    at the position, and return the position after the geometry."""
+    if wkb[position] != 1:
+        raise _UnsupportedWKBError('Big-endian WKB')
+
+    geom_type = _unpack_uint32_le(wkb, position + 1)[0]
+    position += 5
+    if geom_type & 0x20000000:
+        # SRID
+        position += 4
+    if geom_type & 0xC0000000 or (geom_type & 0xFFFF) >= 1000:
+        raise _UnsupportedWKBError('Z or M WKB')
+
+    geom_type &= 0xFF
+    if geom_type == 1:
+        runs.append((offset + position, 1))
+        return position + 16
+    if geom_type == 2:
+        size = _unpack_uint32_le(wkb, position)[0]
+        runs.append((offset + position + 4, size))
+        return position + 4 + 16 * size
+    if geom_type == 3:
+        rings = _unpack_uint32_le(wkb, position)[0]
+        position += 4
+        for _ in range(rings):
+            size = _unpack_uint32_le(wkb, position)[0]
+            runs.append((offset + position + 4, size))
+            position += 4 + 16 * size
+        return position
+    if 4 <= geom_type <= 7:
+        parts = _unpack_uint32_le(wkb, position)[0]
+        position += 4
+        for _ in range(parts):
+            position = _find_wkb_coordinates(wkb, position, offset, runs)
+        return position
+
+    raise _UnsupportedWKBError('WKB geometry type {}'.format(geom_type))
+
+
 def to_geojson(geom, buffer_simplify=True):
     if geom is not None and str(geom) != 'GEOMETRYCOLLECTION EMPTY':
         if buffer_simplify and geom.geom_type in ('Polygon', 'MultiPolygon'):
@@ -256,14 +753,36 @@ def to_geojson(geom, buffer_simplify=True):
 
 
 def is_reprojection_needed(gdf):
-    crs = get_crs(gdf)
-    return crs is not None and crs != 'epsg:4326'
+    return gdf.crs is not None and not is_crs_equivalent(gdf.crs, 4326)
 
 
 def reproject(gdf, epsg=4326):
     return gdf.to_crs(epsg=epsg)
 
 
+def is_crs_equivalent(crs, epsg):
+    """Check if the CRS is equivalent to the EPSG code, regardless of how it is spelled
+    ('EPSG:4326', '+init=epsg:4326', {'init': 'epsg:4326'}, ...) and of the axis order,
+    because the geometries are always in (x, y) order."""
+    return _is_crs_equivalent(CRS.from_user_input(crs), epsg)
+
+
+@lru_cache(maxsize=32)
+def _is_crs_equivalent(crs, epsg):
+    target = CRS.from_epsg(epsg)
+    try:
+        return crs.equals(target, ignore_axis_order=True)
+    except TypeError:
+        # pyproj < 2.5
+        return crs == target
+
+
+@lru_cache(maxsize=32)
+def get_transformer(crs, epsg=4326):
+    """Return the cached (x, y) Transformer from the CRS to the EPSG code."""
+    return Transformer.from_crs(CRS.from_user_input(crs), CRS.from_epsg(epsg), always_xy=True)
+
+
 def get_crs(gdf):
     if gdf.crs is None:
         return None
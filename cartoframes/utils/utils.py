@@ -35,6 +35,7 @@ GEOM_TYPE_POLYGON = 'polygon'
 PG_NULL = '__null'
 
 USER_CONFIG_DIR = appdirs.user_config_dir('cartoframes')
+USER_CACHE_DIR = appdirs.user_cache_dir('cartoframes')
 
 
 def map_geom_type(geom_type):
@@ -372,29 +373,33 @@ def remove_column_from_dataframe(dataframe, name):
 
 
 def encode_row(row):
-    if row is None:
-        row = PG_NULL
-
-    elif isinstance(row, float):
-        if str(row) == 'inf':
-            row = 'Infinity'
-        elif str(row) == '-inf':
-            row = '-Infinity'
-        elif str(row) == 'nan':
-            row = 'NaN'
-
-    elif isinstance(row, type(b'')):
+    return encode_value(row).encode('utf-8')
+
+
+def encode_value(value):
+    if value is None:
+        value = PG_NULL
+
+    elif isinstance(value, float):
+        if str(value) == 'inf':
+            value = 'Infinity'
+        elif str(value) == '-inf':
+            value = '-Infinity'
+        elif str(value) == 'nan':
+            value = 'NaN'
+
+    elif isinstance(value, type(b'')):
         # Decode the input if it's a bytestring
-        row = row.decode('utf-8')
+        value = value.decode('utf-8')
 
     special_keys = ['"', '|', '\n']
-    if isinstance(row, str) and any(key in row for key in special_keys):
+    if isinstance(value, str) and any(key in value for key in special_keys):
         # If the input contains any special key:
         # - replace " by ""
-        # - cover the row with "..."
-        row = '"{}"'.format(row.replace('"', '""'))
+        # - cover the value with "..."
+        value = '"{}"'.format(value.replace('"', '""'))
 
-    return '{}'.format(row).encode('utf-8')
+    return '{}'.format(value)
 
 
 def create_hash(value):
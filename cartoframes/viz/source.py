@@ -73,13 +73,14 @@ class Source:
             self.query = self.manager.compute_query(source)
             self.credentials = self.manager.credentials
         elif isinstance(source, DataFrame):
-            if isinstance(source, GeoDataFrame):
-                if is_reprojection_needed(source):
-                    source = reproject(source)
-
             # DataFrame, GeoDataFrame
             self.type = SourceType.GEOJSON
             self.gdf = GeoDataFrame(source, copy=True)
+
+            if isinstance(source, GeoDataFrame) and has_geometry(source) and is_reprojection_needed(source):
+                # Only the geometry column of the copy is reprojected
+                self.gdf[source.geometry.name] = reproject(source.geometry)
+
             self.set_datetime_columns()
 
             if geom_col in self.gdf:
@@ -0,0 +1,69 @@
+import os
+
+from pandas import DataFrame
+
+from cartoframes.io.managers.cache_manager import CacheManager
+
+
+class TestCacheManager(object):
+
+    def test_get_key(self, tmpdir):
+        # Given
+        cm = CacheManager(str(tmpdir))
+
+        # Then
+        assert cm.get_key('query', 1) == cm.get_key('query', 1)
+        assert cm.get_key('query', 1) != cm.get_key('query', 2)
+
+    def test_read_write(self, tmpdir):
+        # Given
+        cm = CacheManager(str(tmpdir))
+        df = DataFrame({'A': [1, 2, 3]})
+
+        # When
+        cm.write('key', df)
+
+        # Then
+        assert df.equals(cm.read('key'))
+        assert cm.read('other_key') is None
+
+    def test_read_unreadable(self, tmpdir):
+        # Given
+        cm = CacheManager(str(tmpdir))
+        tmpdir.join('key.pkl').write('wrong')
+
+        # When
+        df = cm.read('key')
+
+        # Then
+        assert df is None
+        assert not tmpdir.join('key.pkl').exists()
+
+    def test_evict_least_recently_used(self, tmpdir):
+        # Given
+        df = DataFrame({'A': range(100)})
+        cm = CacheManager(str(tmpdir))
+        cm.write('key1', df)
+        cm.write('key2', df)
+        size = os.path.getsize(str(tmpdir.join('key1.pkl')))
+        os.utime(str(tmpdir.join('key1.pkl')), (0, 0))
+        os.utime(str(tmpdir.join('key2.pkl')), (1, 1))
+
+        # When
+        cm.read('key1')
+        cm.max_size = size * 2
+        cm.write('key3', df)
+
+        # Then
+        assert sorted(os.listdir(str(tmpdir))) == ['key1.pkl', 'key3.pkl']
+
+    def test_clear(self, tmpdir):
+        # Given
+        cm = CacheManager(str(tmpdir))
+        cm.write('key', DataFrame({'A': [1]}))
+
+        # When
+        cm.clear()
+
+        # Then
+        assert os.listdir(str(tmpdir)) == []
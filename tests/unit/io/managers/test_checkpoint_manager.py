@@ -0,0 +1,49 @@
+import os
+
+from cartoframes.io.managers.checkpoint_manager import CheckpointManager
+
+
+class TestCheckpointManager(object):
+
+    def test_get_key(self, tmpdir):
+        # Given
+        cm = CheckpointManager(str(tmpdir))
+
+        # Then
+        assert cm.get_key('table', 1) == cm.get_key('table', 1)
+        assert cm.get_key('table', 1) != cm.get_key('table', 2)
+
+    def test_read_write(self, tmpdir):
+        # Given
+        cm = CheckpointManager(str(tmpdir.join('checkpoints')))
+
+        # When
+        cm.write('key', 10, {2, 0})
+
+        # Then
+        assert cm.read('key') == (10, {0, 2})
+        assert cm.read('other_key') == (None, set())
+
+    def test_read_unreadable(self, tmpdir):
+        # Given
+        cm = CheckpointManager(str(tmpdir))
+        tmpdir.join('key.json').write('wrong')
+
+        # When
+        checkpoint = cm.read('key')
+
+        # Then
+        assert checkpoint == (None, set())
+        assert not tmpdir.join('key.json').exists()
+
+    def test_remove(self, tmpdir):
+        # Given
+        cm = CheckpointManager(str(tmpdir))
+        cm.write('key', 10, {0})
+
+        # When
+        cm.remove('key')
+        cm.remove('key')
+
+        # Then
+        assert os.listdir(str(tmpdir)) == []
@@ -1,15 +1,20 @@
+import re
+import struct
 from collections import namedtuple
 
 import pytest
 
 from carto.datasets import DatasetManager
 from carto.sql import SQLClient, BatchSQLClient, CopySQLClient
-from carto.exceptions import CartoRateLimitException
+from carto.exceptions import CartoException, CartoRateLimitException
 
-from pandas import DataFrame
+from pandas import DataFrame, to_datetime
 from geopandas import GeoDataFrame
 from cartoframes.auth import Credentials
-from cartoframes.io.managers.context_manager import ContextManager, DEFAULT_RETRY_TIMES, retry_copy
+from cartoframes.io.managers.cache_manager import CacheManager
+from cartoframes.io.managers.context_manager import ContextManager, DEFAULT_RETRY_TIMES, retry_copy, \
+    _compute_copy_data, _pipeline_copy_data
+from cartoframes.utils.binary_utils import COPY_SIGNATURE, read_copy_binary
 from cartoframes.utils.columns import ColumnInfo
 
 
@@ -46,8 +51,7 @@ class TestContextManager(object):
         # Given
         query = '__query__'
         columns = [ColumnInfo('A', 'a', 'bigint', False)]
-        mocker.patch.object(ContextManager, 'compute_query', return_value=query)
-        mocker.patch.object(ContextManager, '_get_query_columns_info', return_value=columns)
+        mocker.patch.object(ContextManager, '_compute_query_and_columns', return_value=(query, columns))
         mock = mocker.patch.object(ContextManager, '_copy_to')
 
         # When
@@ -55,7 +59,413 @@ class TestContextManager(object):
         cm.copy_to(query)
 
         # Then
-        mock.assert_called_once_with('SELECT "A" FROM (__query__) _q', columns, 3)
+        mock.assert_called_once_with('SELECT "A" FROM (__query__) _q', columns, 3, use_nullable_dtypes=False,
+                                     chunksize=None, copy_format='csv', geom_format='ewkb', engine='pandas')
+
+    def test_copy_to_binary(self, mocker):
+        # Given
+        query = '__query__'
+        columns = [ColumnInfo('A', 'a', 'bigint', False), ColumnInfo('the_geom', 'the_geom', 'geometry', True)]
+        mocker.patch.object(ContextManager, '_compute_query_and_columns', return_value=(query, columns))
+        mock = mocker.patch.object(CopySQLClient, 'copyto_stream')
+        mock_read = mocker.patch('cartoframes.io.managers.context_manager.read_copy_binary')
+
+        # When
+        cm = ContextManager(self.credentials)
+        cm.copy_to(query, copy_format='binary')
+
+        # Then
+        mock.assert_called_once_with(
+            'COPY (SELECT "A"::bigint AS "A","the_geom" FROM (__query__) _q) TO stdout WITH (FORMAT binary)')
+        assert mock_read.call_args[0][1] == columns
+
+    def test_copy_to_binary_cartodbfied_table(self, mocker):
+        # Given
+        query = '__query__'
+        columns = [
+            ColumnInfo('cartodb_id', 'cartodb_id', 'bigint', False),
+            ColumnInfo('the_geom', 'the_geom', 'geometry', True),
+            ColumnInfo('the_geom_webmercator', 'the_geom_webmercator', 'geometry', True)
+        ]
+        geom = bytes.fromhex('0101000020E6100000000000000000F03F000000000000F03F')
+        # the_geom_webmercator is left out of the COPY query, so the tuples have two fields
+        data = COPY_SIGNATURE + struct.pack('>ii', 0, 0)
+        data += struct.pack('>h', 2) + struct.pack('>iq', 8, 1) + struct.pack('>i', len(geom)) + geom
+        data += struct.pack('>h', -1)
+        mocker.patch.object(ContextManager, '_compute_query_and_columns', return_value=(query, columns))
+        mock = mocker.patch.object(CopySQLClient, 'copyto_stream', return_value=mocker.Mock(read=lambda: data))
+        mock_read = mocker.patch('cartoframes.io.managers.context_manager.read_copy_binary',
+                                 wraps=read_copy_binary)
+
+        # When
+        cm = ContextManager(self.credentials)
+        df = cm.copy_to(query, copy_format='binary')
+
+        # Then
+        select_list = re.match(r'COPY \(SELECT (.*) FROM \(', mock.call_args[0][0]).group(1)
+        select_names = re.findall(r'"([^"]+)"(?:,|$)', select_list)
+        assert select_names == [column.name for column in mock_read.call_args[0][1]]
+        assert list(df.columns) == ['cartodb_id', 'the_geom']
+        assert df['cartodb_id'].tolist() == [1]
+        assert df['the_geom'].tolist() == [geom]
+
+    def test_copy_to_geom_format(self, mocker):
+        # Given
+        query = '__query__'
+        columns = [
+            ColumnInfo('A', 'a', 'bigint', False),
+            ColumnInfo('the_geom', 'the_geom', 'geometry', True),
+            ColumnInfo('the_geom_webmercator', 'the_geom_webmercator', 'geometry', True)
+        ]
+        mocker.patch.object(ContextManager, '_compute_query_and_columns', return_value=(query, columns))
+        mock = mocker.patch.object(ContextManager, '_copy_to')
+
+        # When
+        cm = ContextManager(self.credentials)
+        cm.copy_to(query, geom_format='xy')
+        cm.copy_to(query, geom_format='wkb')
+
+        # Then
+        assert mock.call_args_list[0][0][0] == \
+            'SELECT "A",ST_X("the_geom") AS "the_geom__x",ST_Y("the_geom") AS "the_geom__y" FROM (__query__) _q'
+        assert mock.call_args_list[0][0][1] == [
+            ColumnInfo('A', 'a', 'bigint', False),
+            ColumnInfo('the_geom__x', 'the_geom__x', 'double precision', False),
+            ColumnInfo('the_geom__y', 'the_geom__y', 'double precision', False)
+        ]
+        assert mock.call_args_list[1][0][0] == \
+            'SELECT "A",encode(ST_AsBinary("the_geom"), \'hex\') AS "the_geom" FROM (__query__) _q'
+
+    def test_copy_to_wrong_geom_format(self, mocker):
+        # Given
+        mocker.patch.object(ContextManager, 'compute_query', return_value='__query__')
+
+        # When
+        with pytest.raises(ValueError) as e:
+            cm = ContextManager(self.credentials)
+            cm.copy_to('__query__', geom_format='geojson')
+
+        # Then
+        assert str(e.value) == 'Wrong option for the `geom_format` param. You should provide: ewkb, wkb, wkt, xy.'
+
+    def test_copy_to_arrow(self, mocker):
+        # Given
+        query = '__query__'
+        columns = [ColumnInfo('A', 'a', 'bigint', False)]
+        mocker.patch.object(ContextManager, '_compute_query_and_columns', return_value=(query, columns))
+        mocker.patch.object(CopySQLClient, 'copyto_stream')
+        mock_read = mocker.patch('cartoframes.io.managers.context_manager.read_copy_arrow')
+
+        # When
+        cm = ContextManager(self.credentials)
+        table = cm.copy_to(query, engine='arrow', geom_format='wkt')
+
+        # Then
+        assert mock_read.call_args[0][1:] == (columns, 'wkt')
+        assert table == mock_read.return_value
+
+    def test_copy_to_arrow_ewkb(self, mocker):
+        # Given
+        query = '__query__'
+        columns = [ColumnInfo('the_geom', 'the_geom', 'geometry', True)]
+        mocker.patch.object(ContextManager, '_compute_query_and_columns', return_value=(query, columns))
+        mock_copy = mocker.patch.object(CopySQLClient, 'copyto_stream')
+        mock_read = mocker.patch('cartoframes.io.managers.context_manager.read_copy_arrow')
+
+        # When
+        cm = ContextManager(self.credentials)
+        cm.copy_to(query, engine='arrow')
+
+        # Then
+        assert 'ST_AsBinary("the_geom")' in mock_copy.call_args[0][0]
+        assert mock_read.call_args[0][1:] == (columns, 'wkb')
+
+    def test_copy_to_arrow_binary(self, mocker):
+        # When
+        with pytest.raises(ValueError) as e:
+            cm = ContextManager(self.credentials)
+            cm.copy_to('__query__', engine='arrow', copy_format='binary')
+
+        # Then
+        assert str(e.value) == 'The arrow `engine` only supports the csv `copy_format` without `chunksize`'
+
+    def test_copy_to_parallelism(self, mocker):
+        # Given
+        query = '__query__'
+        columns = [ColumnInfo('A', 'a', 'bigint', False)]
+        mocker.patch.object(ContextManager, '_compute_query_and_columns', return_value=(query, columns))
+        mocker.patch.object(ContextManager, 'execute_query', return_value={'rows': [{'min': 1, 'max': 10}]})
+        mock = mocker.patch.object(ContextManager, '_copy_to', side_effect=[
+            DataFrame({'A': [1, 2, 3, 4]}),
+            DataFrame({'A': [5, 6, 7, 8]}),
+            DataFrame({'A': [9, 10]})
+        ])
+
+        # When
+        cm = ContextManager(self.credentials)
+        df = cm.copy_to(query, parallelism=3, retry_times=2)
+
+        # Then
+        assert [call[0][0] for call in mock.call_args_list] == [
+            'SELECT "A" FROM (__query__) _q WHERE ("cartodb_id" < 4 OR "cartodb_id" IS NULL)',
+            'SELECT "A" FROM (__query__) _q WHERE "cartodb_id" >= 4 AND "cartodb_id" < 7',
+            'SELECT "A" FROM (__query__) _q WHERE "cartodb_id" >= 7'
+        ]
+        assert all(call[1]['retry_times'] == 2 for call in mock.call_args_list)
+        assert df['A'].tolist() == [1, 2, 3, 4, 5, 6, 7, 8, 9, 10]
+        assert df.index.tolist() == list(range(10))
+
+    def test_copy_to_parallelism_empty(self, mocker):
+        # Given
+        query = '__query__'
+        columns = [ColumnInfo('A', 'a', 'bigint', False)]
+        mocker.patch.object(ContextManager, '_compute_query_and_columns', return_value=(query, columns))
+        mocker.patch.object(ContextManager, 'execute_query', return_value={'rows': [{'min': None, 'max': None}]})
+        mock = mocker.patch.object(ContextManager, '_copy_to', return_value=DataFrame({'A': []}))
+
+        # When
+        cm = ContextManager(self.credentials)
+        cm.copy_to(query, parallelism=3)
+
+        # Then
+        assert mock.call_args[0][0] == 'SELECT "A" FROM (__query__) _q'
+
+    def test_copy_to_columns_where(self, mocker):
+        # Given
+        query = '__query__'
+        columns = [
+            ColumnInfo('A', 'a', 'bigint', False),
+            ColumnInfo('B', 'b', 'text', False),
+            ColumnInfo('the_geom', 'the_geom', 'geometry', True)
+        ]
+        mocker.patch.object(ContextManager, '_compute_query_and_columns', return_value=(query, columns))
+        mock = mocker.patch.object(ContextManager, '_copy_to')
+
+        # When
+        cm = ContextManager(self.credentials)
+        cm.copy_to(query, columns=['the_geom', 'A'], where='"A" > 10')
+
+        # Then
+        assert mock.call_args[0][0] == 'SELECT "the_geom","A" FROM (__query__) _q WHERE "A" > 10'
+        assert mock.call_args[0][1] == [columns[2], columns[0]]
+
+    def test_copy_to_parallelism_where(self, mocker):
+        # Given
+        query = '__query__'
+        columns = [ColumnInfo('A', 'a', 'bigint', False)]
+        mocker.patch.object(ContextManager, '_compute_query_and_columns', return_value=(query, columns))
+        mock_query = mocker.patch.object(ContextManager, 'execute_query',
+                                         return_value={'rows': [{'min': 1, 'max': 10}]})
+        mock = mocker.patch.object(ContextManager, '_copy_to', return_value=DataFrame({'A': []}))
+
+        # When
+        cm = ContextManager(self.credentials)
+        cm.copy_to(query, parallelism=2, where='"A" > 0')
+
+        # Then
+        assert mock_query.call_args[0][0] == \
+            'SELECT MIN("cartodb_id") AS min, MAX("cartodb_id") AS max FROM (__query__) _q WHERE "A" > 0'
+        assert [call[0][0] for call in mock.call_args_list] == [
+            'SELECT "A" FROM (__query__) _q WHERE ("A" > 0) AND (("cartodb_id" < 6 OR "cartodb_id" IS NULL))',
+            'SELECT "A" FROM (__query__) _q WHERE ("A" > 0) AND ("cartodb_id" >= 6)'
+        ]
+
+    def test_copy_to_parallelism_boolean_partition_column(self, mocker):
+        # Given
+        query = '__query__'
+        columns = [ColumnInfo('A', 'a', 'boolean', False)]
+        mocker.patch.object(ContextManager, '_compute_query_and_columns', return_value=(query, columns))
+        mocker.patch.object(ContextManager, 'execute_query', return_value={'rows': [{'min': False, 'max': True}]})
+        mock = mocker.patch.object(ContextManager, '_copy_to', return_value=DataFrame({'A': []}))
+
+        # When
+        cm = ContextManager(self.credentials)
+        cm.copy_to(query, parallelism=2, partition_column='A')
+
+        # Then
+        assert [call[0][0] for call in mock.call_args_list] == ['SELECT "A" FROM (__query__) _q']
+
+    def test_copy_to_wrong_columns(self, mocker):
+        # Given
+        columns = [ColumnInfo('A', 'a', 'bigint', False)]
+        mocker.patch.object(ContextManager, '_compute_query_and_columns', return_value=('__query__', columns))
+
+        # When
+        with pytest.raises(ValueError) as e:
+            cm = ContextManager(self.credentials)
+            cm.copy_to('__query__', columns=['A', 'B', 'C'])
+
+        # Then
+        assert str(e.value) == 'Wrong columns. The following columns do not exist in the source: B, C.'
+
+    def test_copy_to_cache(self, mocker, tmpdir):
+        # Given
+        query = '__query__'
+        columns = [ColumnInfo('A', 'a', 'bigint', False)]
+        mocker.patch.object(ContextManager, '_compute_query_and_columns', return_value=(query, columns))
+        mock_query = mocker.patch.object(ContextManager, 'execute_query', return_value={
+            'total_rows': 1, 'rows': [{'updated_at': '2020-01-01T00:00:00+00:00'}]})
+        mock = mocker.patch.object(ContextManager, '_copy_to', return_value=DataFrame({'A': [1, 2]}))
+
+        # When
+        cm = ContextManager(self.credentials)
+        cm.cache_manager = CacheManager(str(tmpdir))
+        df1 = cm.copy_to(query, cache=True)
+        df2 = cm.copy_to(query, cache=True)
+
+        mock_query.return_value = {'total_rows': 1, 'rows': [{'updated_at': '2020-01-02T00:00:00+00:00'}]}
+        cm.copy_to(query, cache=True)
+
+        # Then
+        assert mock_query.call_args[0][0] == \
+            'SELECT max(updated_at) AS updated_at FROM CDB_QueryTables_Updated_At($q$__query__$q$)'
+        assert mock.call_count == 2
+        assert df1.equals(df2)
+
+    def test_copy_to_arrow_cache(self, mocker, tmpdir):
+        pa = pytest.importorskip('pyarrow')
+
+        # Given
+        query = '__query__'
+        columns = [ColumnInfo('A', 'a', 'bigint', False)]
+        mocker.patch.object(ContextManager, '_compute_query_and_columns', return_value=(query, columns))
+        mocker.patch.object(ContextManager, 'execute_query', return_value={
+            'total_rows': 1, 'rows': [{'updated_at': '2020-01-01T00:00:00+00:00'}]})
+        mock = mocker.patch.object(ContextManager, '_copy_to', return_value=pa.table({'A': [1, 2]}))
+
+        # When
+        cm = ContextManager(self.credentials)
+        cm.cache_manager = CacheManager(str(tmpdir))
+        table1 = cm.copy_to(query, cache=True, engine='arrow')
+        table2 = cm.copy_to(query, cache=True, engine='arrow')
+
+        # Then
+        assert mock.call_count == 1
+        assert isinstance(table2, pa.Table)
+        assert table1.equals(table2)
+
+    def test_copy_to_cache_no_tables(self, mocker, tmpdir):
+        # Given
+        query = '__query__'
+        columns = [ColumnInfo('A', 'a', 'bigint', False)]
+        mocker.patch.object(ContextManager, '_compute_query_and_columns', return_value=(query, columns))
+        mocker.patch.object(ContextManager, 'execute_query', return_value={
+            'total_rows': 1, 'rows': [{'updated_at': None}]})
+        mock = mocker.patch.object(ContextManager, '_copy_to', return_value=DataFrame({'A': [1, 2]}))
+
+        # When
+        cm = ContextManager(self.credentials)
+        cm.cache_manager = CacheManager(str(tmpdir))
+        cm.copy_to(query, cache=True)
+        cm.copy_to(query, cache=True)
+
+        # Then
+        assert mock.call_count == 2
+        assert tmpdir.listdir() == []
+
+    def test_compute_query_and_columns(self, mocker):
+        # Given
+        mocker.patch.dict('cartoframes.io.managers.context_manager._schemas', clear=True)
+        mock = mocker.patch.object(SQLClient, 'send', side_effect=[{
+            'rows': [{'__cartoframes_schema': 'fake_user', 'a': None}],
+            'fields': {'__cartoframes_schema': {'type': 'string'}, 'a': {'type': 'number', 'pgtype': 'int8'}}
+        }, {
+            'rows': [],
+            'fields': {'b': {'type': 'string', 'pgtype': 'text'}}
+        }])
+
+        # When
+        cm = ContextManager(self.credentials)
+        query, columns = cm._compute_query_and_columns('table_a')
+        query_b, columns_b = cm._compute_query_and_columns('table_b')
+        cm._compute_query_and_columns('table_a')
+
+        # Then
+        assert query == 'SELECT * FROM "fake_user"."table_a"'
+        assert columns == [ColumnInfo('a', 'a', 'bigint', False)]
+        assert query_b == 'SELECT * FROM "fake_user"."table_b"'
+        assert columns_b == [ColumnInfo('b', 'b', 'text', False)]
+        assert 'current_schema() AS __cartoframes_schema' in mock.call_args_list[0][0][0]
+        assert mock.call_args_list[1][0][0] == 'SELECT * FROM (SELECT * FROM "fake_user"."table_b") _q LIMIT 0'
+        assert mock.call_count == 2
+        assert cm.round_trips == 2
+        assert cm.get_schema() == 'fake_user'
+        assert cm.round_trips == 2
+
+    def test_copy_to_round_trips(self, mocker):
+        # Given
+        mocker.patch.dict('cartoframes.io.managers.context_manager._schemas', clear=True)
+        mocker.patch.object(SQLClient, 'send', return_value={
+            'rows': [{'__cartoframes_schema': 'fake_user', 'a': None}],
+            'fields': {'__cartoframes_schema': {'type': 'string'}, 'a': {'type': 'number', 'pgtype': 'int8'}}
+        })
+        mocker.patch.object(CopySQLClient, 'copyto_stream')
+        mocker.patch('cartoframes.io.managers.context_manager._read_copy_data')
+
+        # When
+        cm = ContextManager(self.credentials)
+        cm.copy_to('table_a')
+
+        # Then
+        assert cm.round_trips == 2
+
+    def test_copy_to_parallelism_chunksize(self, mocker):
+        # When
+        with pytest.raises(ValueError) as e:
+            cm = ContextManager(self.credentials)
+            cm.copy_to('__query__', chunksize=10, parallelism=2)
+
+        # Then
+        assert str(e.value) == '`parallelism` and `chunksize` parameters can not be used together'
+
+    def test_internal_copy_to_nullable_dtypes(self, mocker):
+        # Given
+        from io import BytesIO
+        mocker.patch('cartoframes.io.managers.context_manager._create_auth_client')
+        mocker.patch.object(CopySQLClient, 'copyto_stream', return_value=BytesIO(
+            b'a,b,c,d\n1,1.5,t,x\n__null,__null,__null,__null\n3,NaN,f,""\n'))
+        columns = [
+            ColumnInfo('a', 'a', 'bigint', False),
+            ColumnInfo('b', 'b', 'double precision', False),
+            ColumnInfo('c', 'c', 'boolean', False),
+            ColumnInfo('d', 'd', 'text', False)
+        ]
+
+        # When
+        cm = ContextManager(self.credentials)
+        df = cm._copy_to('__query__', columns, use_nullable_dtypes=True)
+
+        # Then
+        assert [str(dtype) for dtype in df.dtypes] == ['Int64', 'float64', 'boolean', 'object']
+        assert df['a'].isna().tolist() == [False, True, False]
+        assert df['b'].isna().tolist() == [False, True, True]
+        assert df['c'].isna().tolist() == [False, True, False]
+        assert df['c'].fillna(True).tolist() == [True, True, False]
+        assert df['d'].tolist()[2] == ''
+
+    def test_internal_copy_to_chunksize(self, mocker):
+        # Given
+        from io import BytesIO
+        mocker.patch('cartoframes.io.managers.context_manager._create_auth_client')
+        mocker.patch.object(CopySQLClient, 'copyto_stream', return_value=BytesIO(b'a\n1\n2\n3\n'))
+        columns = [ColumnInfo('a', 'a', 'bigint', False)]
+
+        # When
+        cm = ContextManager(self.credentials)
+        chunks = list(cm._copy_to('__query__', columns, chunksize=2))
+
+        # Then
+        assert [chunk['a'].tolist() for chunk in chunks] == [[1, 2], [3]]
+        assert chunks[1].index.tolist() == [2]
+
+    def test_copy_to_wrong_chunksize(self, mocker):
+        # When
+        with pytest.raises(ValueError) as e:
+            cm = ContextManager(self.credentials)
+            cm.copy_to('__query__', chunksize=0)
+
+        # Then
+        assert str(e.value) == '`chunksize` parameter must be an integer > 0'
 
     def test_copy_from(self, mocker):
         # Given
@@ -75,7 +485,251 @@ class TestContextManager(object):
         mock_create_table.assert_called_once_with('''
             BEGIN; CREATE TABLE table_name ("a" bigint); SELECT CDB_CartodbfyTable(\'schema\', \'table_name\'); COMMIT;
         '''.strip())
-        mock.assert_called_once_with(df, 'table_name', columns, DEFAULT_RETRY_TIMES)
+        mock.assert_called_once_with(df, 'table_name', columns, DEFAULT_RETRY_TIMES, True, 1, 0, 4)
+
+    def test_bulk_copy_from(self, mocker):
+        # Given
+        mocker.patch('cartoframes.io.managers.context_manager._create_auth_client')
+        mocker.patch.object(ContextManager, 'has_table', return_value=False)
+        mocker.patch.object(ContextManager, 'get_schema', return_value='schema')
+        mock_query = mocker.patch.object(ContextManager, 'execute_long_running_query')
+        mock = mocker.patch.object(ContextManager, '_copy_from')
+        df = DataFrame({'A': range(10)})
+        columns = [ColumnInfo('A', 'a', 'bigint', False)]
+
+        # When
+        cm = ContextManager(self.credentials)
+        table_name = cm.bulk_copy_from(df, 'TABLE NAME', parallelism=2, chunk_row_size=3)
+
+        # Then
+        assert table_name == 'table_name'
+        assert mock_query.call_args_list == [
+            mocker.call('BEGIN; CREATE TABLE table_name ("a" bigint); ; COMMIT;'),
+            mocker.call("SELECT CDB_CartodbfyTable('schema', 'table_name')")
+        ]
+        assert mock.call_count == 4
+        chunks = [call[0][0] for call in mock.call_args_list]
+        assert [list(chunk['A']) for chunk in chunks] == [[0, 1, 2], [3, 4, 5], [6, 7, 8], [9]]
+        for call in mock.call_args_list:
+            assert call[0][1:] == ('table_name', columns)
+            assert call[1] == {'retry_times': DEFAULT_RETRY_TIMES, 'compress': True, 'compression_level': 1,
+                               'encode_workers': 0, 'max_in_flight': 4}
+
+    def test_bulk_copy_from_replace(self, mocker):
+        # Given
+        mocker.patch('cartoframes.io.managers.context_manager._create_auth_client')
+        mocker.patch.object(ContextManager, 'has_table', return_value=True)
+        mocker.patch.object(ContextManager, 'get_schema', return_value='schema')
+        mocker.patch.object(ContextManager, '_get_query_columns_info',
+                            return_value=[ColumnInfo('A', 'a', 'bigint', False)])
+        mocker.patch.object(ContextManager, '_compare_columns', return_value=True)
+        mock_query = mocker.patch.object(ContextManager, 'execute_long_running_query')
+        mock = mocker.patch.object(ContextManager, '_copy_from')
+        df = DataFrame({'A': range(10)})
+
+        # When
+        cm = ContextManager(self.credentials)
+        cm.bulk_copy_from(df, 'TABLE NAME', 'replace')
+
+        # Then
+        assert mock_query.call_args_list == [
+            mocker.call('BEGIN; TRUNCATE TABLE table_name; ; COMMIT;'),
+            mocker.call("SELECT CDB_CartodbfyTable('schema', 'table_name')")
+        ]
+        assert mock.call_count == 1
+
+    def test_bulk_copy_from_no_cartodbfy(self, mocker):
+        # Given
+        mocker.patch('cartoframes.io.managers.context_manager._create_auth_client')
+        mocker.patch.object(ContextManager, 'has_table', return_value=False)
+        mocker.patch.object(ContextManager, 'get_schema', return_value='schema')
+        mock_query = mocker.patch.object(ContextManager, 'execute_long_running_query')
+        mock = mocker.patch.object(ContextManager, '_copy_from')
+        df = DataFrame({'A': range(10)})
+
+        # When
+        cm = ContextManager(self.credentials)
+        cm.bulk_copy_from(df, 'TABLE NAME', cartodbfy=False, parallelism=4)
+
+        # Then
+        mock_query.assert_called_once_with('BEGIN; CREATE TABLE table_name ("a" bigint); ; COMMIT;')
+        assert [len(call[0][0]) for call in mock.call_args_list] == [3, 3, 3, 1]
+
+    def test_bulk_copy_from_append(self, mocker):
+        # Given
+        mocker.patch('cartoframes.io.managers.context_manager._create_auth_client')
+        mocker.patch.object(ContextManager, 'has_table', return_value=True)
+        mocker.patch.object(ContextManager, 'get_schema', return_value='schema')
+        mock_query = mocker.patch.object(ContextManager, 'execute_long_running_query')
+        mock = mocker.patch.object(ContextManager, '_copy_from')
+        df = DataFrame({'A': range(10)})
+
+        # When
+        cm = ContextManager(self.credentials)
+        cm.bulk_copy_from(df, 'TABLE NAME', 'append', parallelism=2)
+
+        # Then
+        assert mock_query.call_count == 0
+        assert mock.call_count == 2
+
+    def test_bulk_copy_from_drops_created_table_on_error(self, mocker):
+        # Given
+        mocker.patch('cartoframes.io.managers.context_manager._create_auth_client')
+        mocker.patch.object(ContextManager, 'has_table', return_value=False)
+        mocker.patch.object(ContextManager, 'get_schema', return_value='schema')
+        mock_long_query = mocker.patch.object(ContextManager, 'execute_long_running_query')
+        mock_query = mocker.patch.object(ContextManager, 'execute_query')
+        mocker.patch.object(ContextManager, '_copy_from', side_effect=CartoException('error'))
+        df = DataFrame({'A': range(10)})
+
+        # When
+        with pytest.raises(CartoException):
+            cm = ContextManager(self.credentials)
+            cm.bulk_copy_from(df, 'TABLE NAME', parallelism=2)
+
+        # Then
+        mock_long_query.assert_called_once_with('BEGIN; CREATE TABLE table_name ("a" bigint); ; COMMIT;')
+        mock_query.assert_called_once_with('DROP TABLE IF EXISTS table_name')
+
+    def test_bulk_copy_from_keeps_existing_table_on_error(self, mocker):
+        # Given
+        mocker.patch('cartoframes.io.managers.context_manager._create_auth_client')
+        mocker.patch.object(ContextManager, 'has_table', return_value=True)
+        mocker.patch.object(ContextManager, 'get_schema', return_value='schema')
+        mock_query = mocker.patch.object(ContextManager, 'execute_query')
+        mocker.patch.object(ContextManager, '_copy_from', side_effect=CartoException('error'))
+        df = DataFrame({'A': range(10)})
+
+        # When
+        with pytest.raises(CartoException):
+            cm = ContextManager(self.credentials)
+            cm.bulk_copy_from(df, 'TABLE NAME', 'append')
+
+        # Then
+        assert mock_query.call_count == 0
+
+    def test_upsert_from(self, mocker):
+        # Given
+        mocker.patch('cartoframes.io.managers.context_manager._create_auth_client')
+        mocker.patch.object(ContextManager, 'has_table', return_value=True)
+        mocker.patch.object(ContextManager, 'get_schema', return_value='schema')
+        mocker.patch('cartoframes.io.managers.context_manager.uuid.uuid4',
+                     return_value=mocker.Mock(hex='0123456789abcdef'))
+        mock_query = mocker.patch.object(ContextManager, 'execute_query', return_value={'rows': []})
+        mock_long_query = mocker.patch.object(ContextManager, 'execute_long_running_query')
+        mock = mocker.patch.object(ContextManager, '_copy_from')
+        df = DataFrame({'ID': [1, 2], 'B': ['x', 'y']})
+        columns = [ColumnInfo('ID', 'id', 'bigint', False), ColumnInfo('B', 'b', 'text', False)]
+
+        # When
+        cm = ContextManager(self.credentials)
+        table_name = cm.upsert_from(df, 'TABLE NAME', 'ID')
+
+        # Then
+        assert table_name == 'table_name'
+        assert len(mock_query.call_args_list) == 3
+        assert mock_query.call_args_list[0] == mocker.call(
+            'CREATE UNLOGGED TABLE table_name_staging_0123456789 ("id" bigint,"b" text)')
+        index_query = mock_query.call_args_list[1][0][0]
+        assert 'pg_catalog.pg_index' in index_query
+        assert '\'"schema".table_name\'::regclass' in index_query
+        assert "a.attname = 'id'" in index_query
+        assert mock_query.call_args_list[2] == mocker.call('DROP TABLE IF EXISTS table_name_staging_0123456789')
+        assert mock.call_args[0][1:] == ('table_name_staging_0123456789', columns)
+        mock_long_query.assert_called_once_with(
+            'BEGIN; CREATE UNIQUE INDEX IF NOT EXISTS "table_name_id_key" ON table_name ("id"); '
+            'INSERT INTO table_name ("id","b") SELECT "id","b" FROM table_name_staging_0123456789 '
+            'ON CONFLICT ("id") DO UPDATE SET "b" = EXCLUDED."b" '
+            'WHERE (table_name."b") IS DISTINCT FROM (EXCLUDED."b"); COMMIT;')
+
+    def test_upsert_from_existing_unique_index(self, mocker):
+        # Given
+        mocker.patch('cartoframes.io.managers.context_manager._create_auth_client')
+        mocker.patch.object(ContextManager, 'has_table', return_value=True)
+        mocker.patch.object(ContextManager, 'get_schema', return_value='schema')
+        mocker.patch('cartoframes.io.managers.context_manager.uuid.uuid4',
+                     return_value=mocker.Mock(hex='0123456789abcdef'))
+        mocker.patch.object(ContextManager, 'execute_query', return_value={'rows': [{'?column?': 1}]})
+        mock_long_query = mocker.patch.object(ContextManager, 'execute_long_running_query')
+        mocker.patch.object(ContextManager, '_copy_from')
+        df = DataFrame({'CARTODB_ID': [1, 2]})
+
+        # When
+        cm = ContextManager(self.credentials)
+        cm.upsert_from(df, 'table_name', 'CARTODB_ID')
+
+        # Then
+        mock_long_query.assert_called_once_with(
+            'BEGIN; INSERT INTO table_name ("cartodb_id") SELECT "cartodb_id" FROM table_name_staging_0123456789 '
+            'ON CONFLICT ("cartodb_id") DO NOTHING; COMMIT;')
+
+    def test_upsert_from_keeps_error_if_staging_table_drop_fails(self, mocker):
+        # Given
+        mocker.patch('cartoframes.io.managers.context_manager._create_auth_client')
+        mocker.patch.object(ContextManager, 'has_table', return_value=True)
+        mocker.patch.object(ContextManager, 'get_schema', return_value='schema')
+        mocker.patch.object(ContextManager, 'execute_query', side_effect=[None, CartoException('drop error')])
+        mocker.patch.object(ContextManager, '_copy_from', side_effect=CartoException('copy error'))
+        df = DataFrame({'ID': [1, 2]})
+
+        # When
+        with pytest.raises(CartoException) as e:
+            cm = ContextManager(self.credentials)
+            cm.upsert_from(df, 'table_name', 'ID')
+
+        # Then
+        assert str(e.value) == 'copy error'
+
+    def test_upsert_from_drops_staging_table_on_error(self, mocker):
+        # Given
+        mocker.patch('cartoframes.io.managers.context_manager._create_auth_client')
+        mocker.patch.object(ContextManager, 'has_table', return_value=True)
+        mocker.patch.object(ContextManager, 'get_schema', return_value='schema')
+        mock_query = mocker.patch.object(ContextManager, 'execute_query')
+        mocker.patch.object(ContextManager, '_copy_from', side_effect=CartoException('error'))
+        df = DataFrame({'ID': [1, 2]})
+
+        # When
+        with pytest.raises(CartoException):
+            cm = ContextManager(self.credentials)
+            cm.upsert_from(df, 'table_name', 'ID')
+
+        # Then
+        assert mock_query.call_args[0][0].startswith('DROP TABLE IF EXISTS table_name_staging_')
+
+    def test_upsert_from_wrong_key(self, mocker):
+        # Given
+        mocker.patch('cartoframes.io.managers.context_manager._create_auth_client')
+        mocker.patch.object(ContextManager, 'get_schema', return_value='schema')
+        df = DataFrame({'ID': [1, 2]})
+
+        # When
+        with pytest.raises(ValueError) as e:
+            cm = ContextManager(self.credentials)
+            cm.upsert_from(df, 'table_name', 'KEY')
+
+        # Then
+        assert str(e.value) == 'Wrong `upsert_key`. The column "KEY" does not exist in the dataframe.'
+
+    def test_upsert_from_duplicated_key(self, mocker):
+        # Given
+        mocker.patch('cartoframes.io.managers.context_manager._create_auth_client')
+        mocker.patch.object(ContextManager, 'get_schema', return_value='schema')
+        mock_query = mocker.patch.object(ContextManager, 'execute_query')
+        mock_long_query = mocker.patch.object(ContextManager, 'execute_long_running_query')
+        mock = mocker.patch.object(ContextManager, '_copy_from')
+        df = DataFrame({'ID': [1, 2, 1], 'B': ['x', 'y', 'z']})
+
+        # When
+        with pytest.raises(ValueError) as e:
+            cm = ContextManager(self.credentials)
+            cm.upsert_from(df, 'table_name', 'ID')
+
+        # Then
+        assert str(e.value) == 'Wrong `upsert_key`. The column "ID" has duplicated values.'
+        assert mock_query.call_count == 0
+        assert mock_long_query.call_count == 0
+        assert mock.call_count == 0
 
     def test_copy_from_exists_fail(self, mocker):
         # Given
@@ -146,9 +800,84 @@ class TestContextManager(object):
             COPY table_name("a","b") FROM stdin WITH (FORMAT csv, DELIMITER '|', NULL '__null');
         '''.strip()
         assert list(mock.call_args[0][1]) == [
-            b'1|0101000020E610000000000000000000000000000000000000\n',
+            b'1|0101000020E610000000000000000000000000000000000000\n'
             b'2|0101000020E6100000000000000000F03F000000000000F03F\n'
         ]
+        assert mock.call_args[0][2:] == (True, 1)
+
+    def test_compute_copy_data(self):
+        # Given
+        df = DataFrame({
+            'A': [1, 2, 3],
+            'B': [1.5, float('nan'), float('-inf')],
+            'C': ['a', 'b|"c"', None],
+            'D': [True, False, True],
+            'E': [b'x', 1, None],
+            'F': to_datetime(['2020-01-01 10:00:00', None, '2020-01-02 10:00:00'])
+        })
+        columns = [
+            ColumnInfo('A', 'a', 'bigint', False),
+            ColumnInfo('B', 'b', 'double precision', False),
+            ColumnInfo('C', 'c', 'text', False),
+            ColumnInfo('D', 'd', 'boolean', False),
+            ColumnInfo('E', 'e', 'text', False),
+            ColumnInfo('F', 'f', 'timestamp', False)
+        ]
+
+        # When
+        chunks = list(_compute_copy_data(df, columns, batch_size=2))
+
+        # Then
+        assert chunks == [
+            b'1|1.5|a|True|x|2020-01-01 10:00:00\n2|NaN|"b|""c"""|False|1|__null\n',
+            b'3|-Infinity|__null|True|__null|2020-01-02 10:00:00\n'
+        ]
+
+    def test_compute_copy_data_does_not_modify_dataframe(self):
+        # Given
+        df = DataFrame({'s': ['a|b', 'q"x', 'l\nm', 'plain']})
+        columns = [ColumnInfo('s', 's', 'text', False)]
+
+        # When
+        first = list(_compute_copy_data(df, columns))
+        second = list(_compute_copy_data(df, columns))
+
+        # Then
+        assert first == second == [b'"a|b"\n"q""x"\n"l\nm"\nplain\n']
+        assert df['s'].tolist() == ['a|b', 'q"x', 'l\nm', 'plain']
+
+    def test_pipeline_copy_data(self):
+        # Given
+        from shapely.geometry import Point
+        gdf = GeoDataFrame({'A': range(5), 'B': [Point(i, i) for i in range(5)]})
+        columns = [
+            ColumnInfo('A', 'a', 'bigint', False),
+            ColumnInfo('B', 'b', 'geometry', True)
+        ]
+
+        # When
+        chunks = list(_pipeline_copy_data(gdf, columns, workers=2, max_in_flight=1, batch_size=2))
+
+        # Then
+        assert chunks == list(_compute_copy_data(gdf, columns, batch_size=2))
+        assert len(chunks) == 3
+
+    def test_internal_copy_from_encode_workers(self, mocker):
+        # Given
+        mocker.patch('cartoframes.io.managers.context_manager._create_auth_client')
+        mock = mocker.patch.object(CopySQLClient, 'copyfrom')
+        mock_pipeline = mocker.patch('cartoframes.io.managers.context_manager._pipeline_copy_data',
+                                     return_value=iter([b'1\n', b'2\n']))
+        df = DataFrame({'A': [1, 2]})
+        columns = [ColumnInfo('A', 'a', 'bigint', False)]
+
+        # When
+        cm = ContextManager(self.credentials)
+        cm._copy_from(df, 'table_name', columns, encode_workers=2, max_in_flight=8)
+
+        # Then
+        mock_pipeline.assert_called_once_with(df, columns, 2, 8)
+        assert list(mock.call_args[0][1]) == [b'1\n2\n']
 
     def test_rename_table(self, mocker):
         # Given
@@ -278,3 +1007,39 @@ class TestContextManager(object):
 
         with pytest.raises(CartoRateLimitException):
             test_function(retry_times=0)
+
+    def test_retry_copy_decorator_rate_limiter(self, mocker):
+        # Given
+        class ResponseMock:
+            def __init__(self):
+                self.text = 'My text'
+                self.headers = {
+                    'Carto-Rate-Limit-Limit': 10,
+                    'Carto-Rate-Limit-Remaining': 0,
+                    'Retry-After': 2,
+                    'Carto-Rate-Limit-Reset': 5
+                }
+
+        class ManagerMock:
+            def __init__(self):
+                self.rate_limiter = mocker.Mock()
+                self.rate_limiter.backoff.return_value = 2
+                self.calls = 0
+
+            @retry_copy
+            def copy(self, data, retry_times=DEFAULT_RETRY_TIMES):
+                self.calls += 1
+                if self.calls < 3:
+                    raise CartoRateLimitException(ResponseMock())
+                return data
+
+        manager = ManagerMock()
+
+        # When
+        result = manager.copy('data', 5)
+
+        # Then
+        assert result == 'data'
+        assert manager.calls == 3
+        assert manager.rate_limiter.penalize.call_count == 2
+        assert manager.rate_limiter.backoff.call_args_list == [mocker.call(0, 2), mocker.call(1, 2)]
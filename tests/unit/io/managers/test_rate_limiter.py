@@ -0,0 +1,119 @@
+from carto.exceptions import CartoRateLimitException
+
+from cartoframes.auth import Credentials
+from cartoframes.io.managers.rate_limiter import RateLimiter, get_rate_limiter
+
+
+class ResponseMock:
+    def __init__(self, limit, remaining, reset, retry_after=0):
+        self.text = 'My text'
+        self.headers = {
+            'Carto-Rate-Limit-Limit': limit,
+            'Carto-Rate-Limit-Remaining': remaining,
+            'Carto-Rate-Limit-Reset': reset,
+            'Retry-After': retry_after
+        }
+
+
+class EmptyResponseMock:
+    def __init__(self):
+        self.headers = {}
+
+
+class TestRateLimiter(object):
+
+    def test_get_rate_limiter(self):
+        # Given
+        credentials = Credentials('fake_user', 'fake_api_key')
+
+        # Then
+        assert get_rate_limiter(credentials) is get_rate_limiter(Credentials('fake_user', 'fake_api_key'))
+        assert get_rate_limiter(credentials) is not get_rate_limiter(Credentials('other_user', 'fake_api_key'))
+
+    def test_acquire_not_paced(self, mocker):
+        # Given
+        sleep_mock = mocker.patch('cartoframes.io.managers.rate_limiter.time.sleep')
+        rate_limiter = RateLimiter()
+
+        # When
+        for _ in range(10):
+            rate_limiter.acquire()
+
+        # Then
+        assert sleep_mock.call_count == 0
+        assert rate_limiter.get_stats()['throttled_time'] == 0
+
+    def test_update(self):
+        # Given
+        rate_limiter = RateLimiter()
+
+        # When
+        rate_limiter.update(ResponseMock(10, 6, 2))
+        rate_limiter.update(EmptyResponseMock())
+
+        # Then
+        assert rate_limiter.capacity == 10
+        assert 6 <= rate_limiter.tokens < 7
+        assert rate_limiter.refill_rate == 2
+
+    def test_acquire_paced(self, mocker):
+        # Given
+        sleep_mock = mocker.patch('cartoframes.io.managers.rate_limiter.time.sleep')
+        mocker.patch('cartoframes.io.managers.rate_limiter.time.monotonic', return_value=100)
+        rate_limiter = RateLimiter()
+        rate_limiter.update(ResponseMock(10, 0, 5))
+        rate_limiter.tokens = 0.5
+
+        # When
+        sleep_mock.side_effect = lambda delay: setattr(rate_limiter, 'tokens', 1)
+        rate_limiter.acquire()
+
+        # Then
+        sleep_mock.assert_called_once_with(0.25)
+        assert rate_limiter.get_stats() == {
+            'throttled_time': 0.25,
+            'throttled_requests': 1,
+            'rate_limited_requests': 0
+        }
+
+    def test_acquire_without_refill_rate(self, mocker):
+        # Given
+        sleep_mock = mocker.patch('cartoframes.io.managers.rate_limiter.time.sleep')
+        rate_limiter = RateLimiter()
+        rate_limiter.update(ResponseMock(10, 0, 0))
+
+        # When
+        rate_limiter.acquire()
+        rate_limiter.acquire()
+
+        # Then
+        assert rate_limiter.refill_rate is None
+        assert sleep_mock.call_count == 2
+        sleep_mock.assert_called_with(1)
+
+    def test_penalize(self, mocker):
+        # Given
+        mocker.patch('cartoframes.io.managers.rate_limiter.time.monotonic', return_value=100)
+        rate_limiter = RateLimiter()
+
+        # When
+        rate_limiter.penalize(CartoRateLimitException(ResponseMock(10, 0, 5, retry_after=3)))
+
+        # Then
+        assert rate_limiter.blocked_until == 103
+        assert rate_limiter.tokens == 0
+        assert rate_limiter.get_stats()['rate_limited_requests'] == 1
+
+    def test_backoff(self, mocker):
+        # Given
+        mocker.patch('cartoframes.io.managers.rate_limiter.time.sleep')
+        rate_limiter = RateLimiter()
+
+        # When
+        delays = [rate_limiter.backoff(attempt) for attempt in range(10)]
+        retry_after_delay = rate_limiter.backoff(0, retry_after=5)
+
+        # Then
+        assert all(0 <= delay <= min(60, 2 ** attempt) for attempt, delay in enumerate(delays))
+        assert retry_after_delay == 5
+        assert rate_limiter.get_stats()['throttled_time'] == sum(delays) + 5
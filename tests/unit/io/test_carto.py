@@ -1,6 +1,8 @@
 import pytest
 
+import os
 import random
+import numpy as np
 
 from pandas import Index
 from geopandas import GeoDataFrame
@@ -10,8 +12,13 @@ from shapely import wkt
 
 from carto.exceptions import CartoException
 from cartoframes.auth import Credentials
-from cartoframes.io.managers.context_manager import ContextManager
-from cartoframes.io.carto import read_carto, to_carto, copy_table, create_table_from_query
+from cartoframes.io.managers.checkpoint_manager import CheckpointManager
+from cartoframes.io.managers.context_manager import ContextManager, _compute_copy_data
+from cartoframes.utils import geom_utils
+from cartoframes.utils.columns import get_dataframe_columns_info
+from cartoframes.utils.geom_utils import LazyGeoDataFrame, encode_geometries_ewkb
+from cartoframes.io.carto import read_carto, to_carto, copy_table, create_table_from_query, estimate_upload_size, \
+    _get_fingerprint
 
 
 CREDENTIALS = Credentials('fake_user', 'fake_api_key')
@@ -41,7 +48,10 @@ def test_read_carto(mocker):
     gdf = read_carto('__source__', CREDENTIALS)
 
     # Then
-    cm_mock.assert_called_once_with('__source__', None, None, 3)
+    cm_mock.assert_called_once_with('__source__', None, None, 3, use_nullable_dtypes=False,
+                                    chunksize=None, parallelism=1, partition_column='cartodb_id',
+                                    copy_format='csv', geom_format='ewkb', columns=None, where=None,
+                                    cache=False, engine='pandas')
     assert expected.equals(gdf)
     assert gdf.crs == 'epsg:4326'
 
@@ -67,7 +77,10 @@ def test_read_carto_none_as_null_geom_value(mocker):
         ]
     }, geometry='the_geom')
 
-    cm_mock.assert_called_once_with('__source__', None, None, 3)
+    cm_mock.assert_called_once_with('__source__', None, None, 3, use_nullable_dtypes=False,
+                                    chunksize=None, parallelism=1, partition_column='cartodb_id',
+                                    copy_format='csv', geom_format='ewkb', columns=None, where=None,
+                                    cache=False, engine='pandas')
     assert expected.equals(gdf)
     assert gdf.crs == 'epsg:4326'
 
@@ -93,7 +106,10 @@ def test_read_carto_basegeometry_as_null_geom_value(mocker):
         ]
     }, geometry='the_geom')
 
-    cm_mock.assert_called_once_with('__source__', None, None, 3)
+    cm_mock.assert_called_once_with('__source__', None, None, 3, use_nullable_dtypes=False,
+                                    chunksize=None, parallelism=1, partition_column='cartodb_id',
+                                    copy_format='csv', geom_format='ewkb', columns=None, where=None,
+                                    cache=False, engine='pandas')
     assert expected.equals(gdf)
     assert gdf.crs == 'epsg:4326'
 
@@ -126,7 +142,10 @@ def test_read_carto_limit(mocker):
     read_carto('__source__', CREDENTIALS, limit=1)
 
     # Then
-    cm_mock.assert_called_once_with('__source__', None, 1, 3)
+    cm_mock.assert_called_once_with('__source__', None, 1, 3, use_nullable_dtypes=False,
+                                    chunksize=None, parallelism=1, partition_column='cartodb_id',
+                                    copy_format='csv', geom_format='ewkb', columns=None, where=None,
+                                    cache=False, engine='pandas')
 
 
 def test_read_carto_retry_times(mocker):
@@ -138,7 +157,10 @@ def test_read_carto_retry_times(mocker):
     read_carto('__source__', CREDENTIALS, retry_times=1)
 
     # Then
-    cm_mock.assert_called_once_with('__source__', None, None, 1)
+    cm_mock.assert_called_once_with('__source__', None, None, 1, use_nullable_dtypes=False,
+                                    chunksize=None, parallelism=1, partition_column='cartodb_id',
+                                    copy_format='csv', geom_format='ewkb', columns=None, where=None,
+                                    cache=False, engine='pandas')
 
 
 def test_read_carto_schema(mocker):
@@ -150,7 +172,104 @@ def test_read_carto_schema(mocker):
     read_carto('__source__', CREDENTIALS, schema='__schema__')
 
     # Then
-    cm_mock.assert_called_once_with('__source__', '__schema__', None, 3)
+    cm_mock.assert_called_once_with('__source__', '__schema__', None, 3, use_nullable_dtypes=False,
+                                    chunksize=None, parallelism=1, partition_column='cartodb_id',
+                                    copy_format='csv', geom_format='ewkb', columns=None, where=None,
+                                    cache=False, engine='pandas')
+
+
+def test_read_carto_parallelism(mocker):
+    # Given
+    mocker.patch('cartoframes.utils.geom_utils.set_geometry')
+    cm_mock = mocker.patch.object(ContextManager, 'copy_to')
+
+    # When
+    read_carto('__source__', CREDENTIALS, parallelism=4, partition_column='id', copy_format='csv')
+
+    # Then
+    cm_mock.assert_called_once_with('__source__', None, None, 3, use_nullable_dtypes=False, chunksize=None,
+                                    parallelism=4, partition_column='id', copy_format='csv',
+                                    geom_format='ewkb', columns=None, where=None,
+                                    cache=False, engine='pandas')
+
+
+def test_read_carto_geom_format_xy(mocker):
+    # Given
+    cm_mock = mocker.patch.object(ContextManager, 'copy_to')
+    cm_mock.return_value = GeoDataFrame({
+        'cartodb_id': [1, 2, 3],
+        'the_geom__x': [0.0, 10.0, None],
+        'the_geom__y': [0.0, 15.0, None]
+    })
+    expected = GeoDataFrame({
+        'cartodb_id': [1, 2, 3],
+        'the_geom': [
+            Point([0, 0]),
+            Point([10, 15]),
+            None
+        ]
+    }, geometry='the_geom')
+
+    # When
+    gdf = read_carto('__source__', CREDENTIALS, geom_format='xy')
+
+    # Then
+    assert cm_mock.call_args[1]['geom_format'] == 'xy'
+    assert expected.equals(gdf)
+    assert gdf.crs == 'epsg:4326'
+
+
+def test_read_carto_geom_format_wkb(mocker):
+    # Given
+    cm_mock = mocker.patch.object(ContextManager, 'copy_to')
+    cm_mock.return_value = GeoDataFrame({
+        'cartodb_id': [1, 2, 3],
+        'the_geom': [
+            '010100000000000000000000000000000000000000',
+            None,
+            '010100000000000000000034400000000000003e40'
+        ]
+    })
+    expected = GeoDataFrame({
+        'cartodb_id': [1, 2, 3],
+        'the_geom': [
+            Point([0, 0]),
+            None,
+            Point([20, 30])
+        ]
+    }, geometry='the_geom')
+
+    # When
+    gdf = read_carto('__source__', CREDENTIALS, geom_format='wkb')
+
+    # Then
+    assert expected.equals(gdf)
+
+
+def test_read_carto_lazy_geom(mocker):
+    # Given
+    cm_mock = mocker.patch.object(ContextManager, 'copy_to')
+    cm_mock.return_value = GeoDataFrame({
+        'cartodb_id': [1, 2, 3],
+        'the_geom': [
+            '0101000020E610000000000000000000000000000000000000',
+            None,
+            '0101000020E610000000000000000034400000000000003E40'
+        ]
+    })
+    decode_spy = mocker.spy(geom_utils, 'decode_geometry')
+
+    # When
+    gdf = read_carto('__source__', CREDENTIALS, lazy_geom=True, index_col='cartodb_id')
+
+    # Then
+    assert isinstance(gdf, LazyGeoDataFrame)
+    assert not gdf.is_decoded
+    assert gdf.index.tolist() == [1, 2, 3]
+    assert gdf['the_geom'].tolist() == [Point([0, 0]), None, Point([20, 30])]
+    assert gdf.is_decoded
+    assert gdf.crs == 'epsg:4326'
+    decode_spy.assert_called_once()
 
 
 def test_read_carto_index_col_exists(mocker):
@@ -206,6 +325,54 @@ def test_read_carto_index_col_not_exists(mocker):
     assert expected.equals(gdf)
 
 
+def test_read_carto_chunksize(mocker):
+    # Given
+    cm_mock = mocker.patch.object(ContextManager, 'copy_to')
+    cm_mock.return_value = iter([
+        GeoDataFrame({
+            'cartodb_id': [1, 2],
+            'the_geom': [
+                '010100000000000000000000000000000000000000',
+                '010100000000000000000024400000000000002e40'
+            ]
+        }),
+        GeoDataFrame({
+            'cartodb_id': [3],
+            'the_geom': [
+                '010100000000000000000034400000000000003e40'
+            ]
+        }, index=[2])
+    ])
+    expected = [
+        GeoDataFrame({
+            'cartodb_id': [1, 2],
+            'the_geom': [
+                Point([0, 0]),
+                Point([10, 15])
+            ]
+        }, geometry='the_geom'),
+        GeoDataFrame({
+            'cartodb_id': [3],
+            'the_geom': [
+                Point([20, 30])
+            ]
+        }, geometry='the_geom', index=[2])
+    ]
+
+    # When
+    chunks = read_carto('__source__', CREDENTIALS, chunksize=2)
+
+    # Then
+    cm_mock.assert_called_once_with('__source__', None, None, 3, use_nullable_dtypes=False, chunksize=2,
+                                    parallelism=1, partition_column='cartodb_id',
+                                    copy_format='csv', geom_format='ewkb', columns=None, where=None,
+                                    cache=False, engine='pandas')
+    chunks = list(chunks)
+    assert len(chunks) == 2
+    assert expected[0].equals(chunks[0])
+    assert expected[1].equals(chunks[1])
+
+
 def test_read_carto_decode_geom_false(mocker):
     # Given
     cm_mock = mocker.patch.object(ContextManager, 'copy_to')
@@ -381,6 +548,237 @@ def test_to_carto_chunks(mocker):
     assert norm_table_name == table_name
 
 
+def test_to_carto_does_not_copy_dataframe(mocker):
+    # Given
+    cm_mock = mocker.patch.object(ContextManager, 'copy_from', return_value='table_name')
+    df = GeoDataFrame({'A': [1, 2], 'B': [1.5, 2.5], 'geom': [Point(0, 0), Point(1000, 1000)]},
+                      geometry='geom', crs='epsg:3857', index=Index([5, 6], name='idx'))
+    expected = df.copy()
+
+    # When
+    to_carto(df, 'table_name', CREDENTIALS, index=True, skip_quota_warning=True)
+
+    # Then
+    uploaded = cm_mock.call_args[0][0]
+    assert list(uploaded.columns) == ['A', 'B', 'the_geom', 'idx']
+    assert np.shares_memory(uploaded['A'].values, df['A'].values)
+    assert np.shares_memory(uploaded['B'].values, df['B'].values)
+    assert uploaded.crs == 'epsg:3857'
+    assert df.equals(expected)
+    assert df.crs == 'epsg:3857'
+
+
+def test_to_carto_does_not_modify_string_columns(mocker):
+    copyfrom_mock = mocker.patch('carto.sql.CopySQLClient.copyfrom')
+    mocker.patch.object(ContextManager, 'has_table', return_value=False)
+    mocker.patch.object(ContextManager, 'get_schema', return_value='public')
+    mocker.patch.object(ContextManager, 'execute_long_running_query')
+
+    # Given
+    df = GeoDataFrame({'s': ['a|b', 'q"x', 'l\nm'], 'n': [1, 2, 3]})
+    expected = df.copy()
+
+    # When
+    sent = []
+    for _ in range(2):
+        to_carto(df, 'table_name', CREDENTIALS, skip_quota_warning=True)
+        sent.append(b''.join(copyfrom_mock.call_args[0][1]))
+
+    # Then
+    assert sent[0] == sent[1] == b'"a|b"|1\n"q""x"|2\n"l\nm"|3\n'
+    assert df.equals(expected)
+
+
+def test_to_carto_reprojects_while_encoding(mocker):
+    cm_mock = mocker.patch.object(ContextManager, 'copy_from', return_value='table_name')
+
+    # Given
+    df = GeoDataFrame({'geom': [Point(0, 0), None, Point(1000, 1000)]}, geometry='geom', crs='EPSG:3857')
+
+    # When
+    to_carto(df, 'table_name', CREDENTIALS, skip_quota_warning=True)
+
+    # Then
+    uploaded = cm_mock.call_args[0][0]
+    assert encode_geometries_ewkb(uploaded.geometry).tolist() == \
+        encode_geometries_ewkb(df.geometry.to_crs(epsg=4326)).tolist()
+
+
+def test_estimate_upload_size():
+    # Given
+    gdf = GeoDataFrame({
+        'A': [1, -20, 300, 0],
+        'B': [1.5, 2.25, None, 4.0],
+        'C': ['a', 'bb', None, 'dddd'],
+        'D': [True, False, True, True],
+        'the_geom': [Point(0, 0), Point(1, 1), None, Point(2, 2)]
+    }, geometry='the_geom')
+    data = _compute_copy_data(gdf, get_dataframe_columns_info(gdf))
+
+    # When
+    size = estimate_upload_size(gdf)
+
+    # Then
+    assert size == sum(len(chunk) for chunk in data)
+
+
+def test_estimate_upload_size_empty():
+    # Then
+    assert estimate_upload_size(GeoDataFrame({'A': []})) == 0
+
+
+def test_to_carto_parallelism(mocker):
+    # Given
+    table_name = '__table_name__'
+    cm_mock = mocker.patch.object(ContextManager, 'bulk_copy_from')
+    cm_mock.return_value = table_name
+    seq_mock = mocker.patch.object(ContextManager, 'copy_from')
+    df = GeoDataFrame({'A': range(1000)})
+
+    # When
+    norm_table_name = to_carto(df, table_name, CREDENTIALS, max_upload_size=1000, skip_quota_warning=True,
+                               parallelism=4)
+
+    # Then
+    assert norm_table_name == table_name
+    assert seq_mock.call_count == 0
+    cm_mock.assert_called_once_with(mocker.ANY, table_name, 'fail', True, 3, True, 1, 4, mocker.ANY, 0, 4)
+    assert cm_mock.call_args[0][8] < 1000
+
+
+def test_to_carto_defer_cartodbfy(mocker):
+    # Given
+    table_name = '__table_name__'
+    cm_mock = mocker.patch.object(ContextManager, 'bulk_copy_from', return_value=table_name)
+    seq_mock = mocker.patch.object(ContextManager, 'copy_from')
+    df = GeoDataFrame({'A': range(1000)})
+
+    # When
+    norm_table_name = to_carto(df, table_name, CREDENTIALS, max_upload_size=1000, skip_quota_warning=True,
+                               defer_cartodbfy=True)
+
+    # Then
+    assert norm_table_name == table_name
+    assert seq_mock.call_count == 0
+    cm_mock.assert_called_once_with(mocker.ANY, table_name, 'fail', True, 3, True, 1, 1, mocker.ANY, 0, 4)
+
+
+def test_to_carto_resume(mocker, tmpdir):
+    # Given
+    table_name = 'table_name'
+    mocker.patch('cartoframes.io.carto.CheckpointManager', return_value=CheckpointManager(str(tmpdir)))
+    cm_mock = mocker.patch.object(ContextManager, 'copy_from', return_value=table_name)
+    cm_mock.side_effect = [table_name, table_name, CartoException('error')]
+    gdf = GeoDataFrame({'A': range(40), 'geometry': [Point(i, i) for i in range(40)]})
+
+    # When
+    with pytest.raises(CartoException):
+        to_carto(gdf, table_name, CREDENTIALS, max_upload_size=500, skip_quota_warning=True, resume=True)
+
+    cm_mock.reset_mock(side_effect=True)
+    cm_mock.return_value = table_name
+    norm_table_name = to_carto(gdf, table_name, CREDENTIALS, max_upload_size=500, skip_quota_warning=True,
+                               resume=True)
+
+    # Then
+    assert norm_table_name == table_name
+    chunks = [call[0][0] for call in cm_mock.call_args_list]
+    assert chunks[0]['A'].iloc[0] > 0
+    assert sum(len(chunk) for chunk in chunks) < 40
+    assert chunks[-1]['A'].iloc[-1] == 39
+    assert all(call[0][2] == 'append' for call in cm_mock.call_args_list)
+    assert os.listdir(str(tmpdir)) == []
+
+
+def test_to_carto_resume_other_chunk_size(mocker, tmpdir):
+    # Given
+    table_name = 'table_name'
+    mocker.patch('cartoframes.io.carto.CheckpointManager', return_value=CheckpointManager(str(tmpdir)))
+    cm_mock = mocker.patch.object(ContextManager, 'copy_from', return_value=table_name)
+    cm_mock.side_effect = [table_name, table_name, CartoException('error')]
+    gdf = GeoDataFrame({'A': range(40), 'geometry': [Point(i, i) for i in range(40)]})
+
+    # When
+    with pytest.raises(CartoException):
+        to_carto(gdf, table_name, CREDENTIALS, max_upload_size=500, skip_quota_warning=True, resume=True)
+
+    first_chunks = [len(call[0][0]) for call in cm_mock.call_args_list]
+    cm_mock.reset_mock(side_effect=True)
+    cm_mock.return_value = table_name
+    to_carto(gdf, table_name, CREDENTIALS, max_upload_size=300, skip_quota_warning=True, resume=True)
+
+    # Then
+    chunks = [call[0][0] for call in cm_mock.call_args_list]
+    assert all(len(chunk) == first_chunks[0] for chunk in chunks[:-1])
+    assert chunks[0]['A'].iloc[0] == 2 * first_chunks[0]
+    assert chunks[-1]['A'].iloc[-1] == 39
+    assert os.listdir(str(tmpdir)) == []
+
+
+def test_get_fingerprint():
+    # Given
+    gdf = GeoDataFrame({'A': range(3), 'geometry': [Point(i, i) for i in range(3)]}, crs='epsg:4326')
+    other_gdf = gdf.copy()
+    other_gdf.loc[2, 'geometry'] = Point(0, 0)
+
+    # When
+    fingerprint = _get_fingerprint(gdf)
+
+    # Then
+    assert fingerprint == _get_fingerprint(gdf.copy())
+    assert fingerprint != _get_fingerprint(other_gdf)
+    assert fingerprint != _get_fingerprint(gdf.to_crs('epsg:3857'))
+
+
+def test_to_carto_resume_parallelism(mocker):
+    # Given
+    df = GeoDataFrame({'A': [1]})
+
+    # When
+    with pytest.raises(ValueError) as e:
+        to_carto(df, '__table_name__', CREDENTIALS, parallelism=2, resume=True)
+
+    # Then
+    assert str(e.value) == '`resume` parameter can not be used with the "upsert" `if_exists`, ' \
+                           '`parallelism` or `defer_cartodbfy` parameters'
+
+
+def test_to_carto_wrong_parallelism(mocker):
+    # Given
+    df = GeoDataFrame({'A': [1]})
+
+    # When
+    with pytest.raises(ValueError) as e:
+        to_carto(df, '__table_name__', CREDENTIALS, parallelism=0)
+
+    # Then
+    assert str(e.value) == '`parallelism` parameter must be an integer > 0'
+
+
+def test_to_carto_wrong_encode_workers(mocker):
+    # Given
+    df = GeoDataFrame({'A': [1]})
+
+    # When
+    with pytest.raises(ValueError) as e:
+        to_carto(df, '__table_name__', CREDENTIALS, encode_workers=-1)
+
+    # Then
+    assert str(e.value) == '`encode_workers` parameter must be an integer >= 0'
+
+
+def test_to_carto_encode_workers_parallelism(mocker):
+    # Given
+    df = GeoDataFrame({'A': [1]})
+
+    # When
+    with pytest.raises(ValueError) as e:
+        to_carto(df, '__table_name__', CREDENTIALS, encode_workers=2, parallelism=2)
+
+    # Then
+    assert str(e.value) == '`encode_workers` parameter can not be used with `parallelism` > 1'
+
+
 def test_to_carto_wrong_dataframe(mocker):
     # When
     with pytest.raises(ValueError) as e:
@@ -424,7 +822,35 @@ def test_to_carto_wrong_if_exists(mocker):
         to_carto(df, '__table_name__', if_exists='keep_calm', skip_quota_warning=True)
 
     # Then
-    assert str(e.value) == 'Wrong option for the `if_exists` param. You should provide: fail, replace, append.'
+    assert str(e.value) == 'Wrong option for the `if_exists` param. You should provide: ' \
+                           'fail, replace, append, upsert.'
+
+
+def test_to_carto_if_exists_upsert(mocker):
+    # Given
+    table_name = '__table_name__'
+    cm_mock = mocker.patch.object(ContextManager, 'upsert_from', return_value=table_name)
+    df = GeoDataFrame({'id': [1, 2], 'geometry': [Point([0, 0]), Point([1, 1])]})
+
+    # When
+    norm_table_name = to_carto(df, table_name, CREDENTIALS, if_exists='upsert', upsert_key='id',
+                               skip_quota_warning=True)
+
+    # Then
+    assert norm_table_name == table_name
+    cm_mock.assert_called_once_with(mocker.ANY, table_name, 'id', True, 3, True, 1, 1, 2, 0, 4)
+
+
+def test_to_carto_if_exists_upsert_no_key(mocker):
+    # Given
+    df = GeoDataFrame({'id': [1, 2]})
+
+    # When
+    with pytest.raises(ValueError) as e:
+        to_carto(df, '__table_name__', CREDENTIALS, if_exists='upsert', skip_quota_warning=True)
+
+    # Then
+    assert str(e.value) == '`upsert_key` parameter is required when `if_exists` is "upsert"'
 
 
 def test_to_carto_if_exists_replace(mocker):
@@ -0,0 +1,72 @@
+"""Unit tests for cartoframes.utils.arrow_utils"""
+
+import io
+import json
+
+import pytest
+
+from shapely.geometry import Point
+
+from cartoframes.utils.arrow_utils import read_copy_arrow, arrow_to_geodataframe
+from cartoframes.utils.columns import ColumnInfo
+
+pa = pytest.importorskip('pyarrow')
+
+
+class TestArrowUtils(object):
+    """Tests for functions in arrow_utils module"""
+
+    def setup_method(self):
+        self.columns = [
+            ColumnInfo('id', 'id', 'bigint', False),
+            ColumnInfo('value', 'value', 'double precision', False),
+            ColumnInfo('flag', 'flag', 'boolean', False),
+            ColumnInfo('name', 'name', 'text', False),
+            ColumnInfo('the_geom', 'the_geom', 'geometry(Geometry, 4326)', True)
+        ]
+        self.data = (
+            b'id,value,flag,name,the_geom\n'
+            b'1,1.5,t,a,0101000000000000000000F03F000000000000F03F\n'
+            b'__null,NaN,__null,__null,__null\n'
+            b'3,-2,f,,010100000000000000000024400000000000002e40\n'
+        )
+
+    def test_read_copy_arrow(self):
+        table = read_copy_arrow(io.BytesIO(self.data), self.columns)
+
+        assert table.schema.types == [pa.int64(), pa.float64(), pa.bool_(), pa.string(), pa.binary()]
+        assert table.column('id').to_pylist() == [1, None, 3]
+        assert table.column('flag').to_pylist() == [True, None, False]
+        assert table.column('name').to_pylist() == ['a', None, '']
+        assert table.column('the_geom').to_pylist() == [
+            bytes.fromhex('0101000000000000000000F03F000000000000F03F'),
+            None,
+            bytes.fromhex('010100000000000000000024400000000000002e40')
+        ]
+
+    def test_read_copy_arrow_geo_metadata(self):
+        table = read_copy_arrow(io.BytesIO(self.data), self.columns)
+
+        field = table.schema.field('the_geom')
+        geo_metadata = json.loads(table.schema.metadata[b'geo'])
+        assert field.metadata[b'ARROW:extension:name'] == b'geoarrow.wkb'
+        assert geo_metadata['primary_column'] == 'the_geom'
+        assert geo_metadata['columns']['the_geom']['encoding'] == 'WKB'
+        assert geo_metadata['columns']['the_geom']['crs']['id'] == {'authority': 'EPSG', 'code': 4326}
+        assert json.loads(field.metadata[b'ARROW:extension:metadata'])['crs']['id']['code'] == 4326
+
+    def test_read_copy_arrow_wkt(self):
+        data = b'id,the_geom\n1,POINT(1 1)\n'
+        table = read_copy_arrow(io.BytesIO(data), [self.columns[0], self.columns[-1]], geom_format='wkt')
+
+        assert table.column('the_geom').to_pylist() == ['POINT(1 1)']
+        assert table.schema.field('the_geom').metadata[b'ARROW:extension:name'] == b'geoarrow.wkt'
+
+    def test_arrow_to_geodataframe(self):
+        table = read_copy_arrow(io.BytesIO(self.data), self.columns)
+
+        gdf = arrow_to_geodataframe(table)
+
+        assert gdf.geometry.name == 'the_geom'
+        assert gdf.crs == 'epsg:4326'
+        assert gdf['the_geom'].tolist() == [Point(1, 1), None, Point(10, 15)]
@@ -0,0 +1,93 @@
+"""Unit tests for cartoframes.utils.binary_utils"""
+
+import struct
+
+import pytest
+import pandas as pd
+
+from cartoframes.utils.binary_utils import COPY_SIGNATURE, get_binary_cast_type, read_copy_binary
+from cartoframes.utils.columns import ColumnInfo
+
+
+def _copy_binary(rows):
+    data = COPY_SIGNATURE + struct.pack('>ii', 0, 0)
+    for row in rows:
+        data += struct.pack('>h', len(row))
+        for value in row:
+            if value is None:
+                data += struct.pack('>i', -1)
+            else:
+                data += struct.pack('>i', len(value)) + value
+    return data + struct.pack('>h', -1)
+
+
+class TestBinaryUtils(object):
+    """Tests for functions in binary_utils module"""
+
+    def setup_method(self):
+        self.columns = [
+            ColumnInfo('id', 'id', 'bigint', False),
+            ColumnInfo('value', 'value', 'double precision', False),
+            ColumnInfo('flag', 'flag', 'boolean', False),
+            ColumnInfo('name', 'name', 'text', False),
+            ColumnInfo('date', 'date', 'timestamp', False),
+            ColumnInfo('the_geom', 'the_geom', 'geometry', True)
+        ]
+        self.geom = bytes.fromhex('0101000020E6100000000000000000F03F000000000000F03F')
+        self.rows = [
+            [struct.pack('>q', 1), struct.pack('>d', 1.5), b'\x01', 'à'.encode('utf-8'),
+             struct.pack('>q', 86400 * 1000000), self.geom],
+            [None, None, None, None, None, None],
+            [struct.pack('>q', 3), struct.pack('>d', -2.0), b'\x00', b'', struct.pack('>q', 0), self.geom]
+        ]
+
+    def test_get_binary_cast_type(self):
+        assert [get_binary_cast_type(column) for column in self.columns] == [
+            'bigint', 'double precision', 'boolean', 'text', 'timestamp', None]
+        assert get_binary_cast_type(ColumnInfo('a', 'a', 'json', False)) == 'text'
+
+    def test_read_copy_binary(self):
+        df = read_copy_binary(_copy_binary(self.rows), self.columns)
+
+        assert list(df.columns) == ['id', 'value', 'flag', 'name', 'date', 'the_geom']
+        assert df['id'].isna().tolist() == [False, True, False]
+        assert df['id'].dropna().tolist() == [1, 3]
+        assert df['value'].isna().tolist() == [False, True, False]
+        assert df['flag'].tolist() == [True, None, False]
+        assert df['name'].tolist() == ['à', None, '']
+        assert df['date'].tolist()[0] == pd.Timestamp('2000-01-02')
+        assert df['date'].isna().tolist() == [False, True, False]
+        assert df['the_geom'].tolist() == [self.geom, None, self.geom]
+
+    def test_read_copy_binary_nullable_dtypes(self):
+        df = read_copy_binary(_copy_binary(self.rows), self.columns, use_nullable_dtypes=True)
+
+        assert str(df['id'].dtype) == 'Int64'
+        assert str(df['flag'].dtype) == 'boolean'
+        assert df['id'].isna().tolist() == [False, True, False]
+        assert df['flag'].isna().tolist() == [False, True, False]
+
+    def test_read_copy_binary_fixed_width(self):
+        columns = [
+            ColumnInfo('id', 'id', 'integer', False),
+            ColumnInfo('value', 'value', 'real', False)
+        ]
+        rows = [[struct.pack('>i', i), struct.pack('>f', i / 2)] for i in range(5)]
+
+        df = read_copy_binary(_copy_binary(rows), columns)
+
+        assert str(df['id'].dtype) == 'int64'
+        assert df['id'].tolist() == [0, 1, 2, 3, 4]
+        assert df['value'].tolist() == [0, 0.5, 1, 1.5, 2]
+
+    def test_read_copy_binary_empty(self):
+        df = read_copy_binary(_copy_binary([]), self.columns)
+
+        assert list(df.columns) == ['id', 'value', 'flag', 'name', 'date', 'the_geom']
+        assert len(df) == 0
+
+    def test_read_copy_binary_wrong_signature(self):
+        with pytest.raises(ValueError) as e:
+            read_copy_binary(b'id,value\n', self.columns)
+
+        assert str(e.value) == 'Wrong binary COPY data: invalid signature.'
@@ -7,8 +7,8 @@ from geopandas import GeoDataFrame
 
 from cartoframes.utils.geom_utils import set_geometry
 from cartoframes.utils.columns import ColumnInfo, get_dataframe_columns_info, normalize_names, \
-                                      obtain_converters, _convert_int, _convert_float, \
-                                      _convert_bool, _convert_generic
+                                      obtain_converters, obtain_dtypes, obtain_nullable_dtypes, obtain_na_values, \
+                                      _convert_int, _convert_float, _convert_bool, _convert_generic
 
 
 class TestColumns(object):
@@ -134,6 +134,41 @@ class TestColumns(object):
         assert converters['flag'] == _convert_bool
         assert converters['number'] == _convert_float
 
+    def test_dtypes(self):
+        columns = [
+            ColumnInfo('cartodb_id', 'cartodb_id', 'integer', False),
+            ColumnInfo('the_geom', 'the_geom', 'geometry(Geometry, 4326)', True),
+            ColumnInfo('name', 'name', 'text', False),
+            ColumnInfo('flag', 'flag', 'boolean', False),
+            ColumnInfo('number', 'number', 'double precision', False),
+            ColumnInfo('date', 'date', 'timestamp', False)
+        ]
+
+        dtypes = obtain_dtypes(columns)
+        nullable_dtypes = obtain_nullable_dtypes(columns)
+
+        assert dtypes == {
+            'the_geom': 'object',
+            'name': 'object'
+        }
+        assert nullable_dtypes == {
+            'cartodb_id': 'Int64',
+            'flag': 'boolean'
+        }
+
+    def test_na_values(self):
+        columns = [
+            ColumnInfo('cartodb_id', 'cartodb_id', 'integer', False),
+            ColumnInfo('number', 'number', 'double precision', False)
+        ]
+
+        na_values = obtain_na_values(columns)
+
+        assert na_values == {
+            'cartodb_id': ['__null'],
+            'number': ['__null', 'NaN']
+        }
+
     def test_column_info_sort(self):
         columns = [
             ColumnInfo('cartodb_id', 'cartodb_id', 'integer', False),
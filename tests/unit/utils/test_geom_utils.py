@@ -1,14 +1,21 @@
 """Unit tests for cartoframes.data.utils"""
 
+import pytest
+import numpy as np
 import pandas as pd
 import geopandas as gpd
 
 from shapely.geos import lgeos
-from shapely.geometry import Point
+from shapely import wkb
+from shapely.geometry import Point, LineString, MultiPolygon
 
+from cartoframes.utils import geom_utils
 from cartoframes.utils.geom_utils import (ENC_EWKT, ENC_SHAPELY, ENC_WKB,
                                           ENC_WKB_BHEX, ENC_WKB_HEX, ENC_WKT,
-                                          decode_geometry, decode_geometry_item, detect_encoding_type)
+                                          decode_geometry, decode_geometry_item, detect_encoding_type,
+                                          detect_encoding_types, encode_geometries_ewkb, set_geometry,
+                                          set_lazy_geometry, LazyGeoDataFrame, is_reprojection_needed,
+                                          get_transformer)
 
 
 class TestGeomUtils(object):
@@ -49,6 +56,152 @@ class TestGeomUtils(object):
         decoded_geom = decode_geometry(geom_none)
         assert str(decoded_geom) == str(expected_decoded_geom)
 
+    def test_decode_geometry_nulls_aligned(self):
+        geom = pd.Series(['POINT(0 0)', None, '', 'POINT(1 1)'], index=[3, 3, 1, 0])
+
+        decoded_geom = decode_geometry(geom)
+
+        assert decoded_geom.index.tolist() == [3, 3, 1, 0]
+        assert decoded_geom.tolist() == [Point([0, 0]), None, None, Point([1, 1])]
+
+    def test_decode_geometry_bulk_encodings(self):
+        expected_decoded_geom = [None, Point([1234, 5789])]
+        for geom in [
+            [None, b'\x01\x01\x00\x00\x00\x00\x00\x00\x00\x00H\x93@\x00\x00\x00\x00\x00\x9d\xb6@'],
+            [None, '0101000020E6100000000000000048934000000000009DB640'],
+            [None, b'0101000000000000000048934000000000009DB640'],
+            [None, 'POINT (1234 5789)'],
+            [None, 'SRID=4326;POINT (1234 5789)'],
+            [None, Point([1234, 5789])]
+        ]:
+            decoded_geom = decode_geometry(pd.Series(geom))
+
+            assert isinstance(decoded_geom, gpd.GeoSeries)
+            assert decoded_geom.tolist() == expected_decoded_geom
+
+    def test_set_geometry_nulls_aligned(self):
+        gdf = gpd.GeoDataFrame({'A': [1, 2, 3], 'geom': ['POINT(0 0)', None, 'POINT(1 1)']}, index=[5, 5, 6])
+
+        set_geometry(gdf, 'geom', inplace=True)
+
+        assert gdf.geometry.tolist() == [Point([0, 0]), None, Point([1, 1])]
+
+    def test_decode_geometry_n_jobs(self, mocker):
+        mocker.patch.object(geom_utils, 'PARALLEL_DECODE_MIN_ROWS', 0)
+        mocker.patch.object(geom_utils, '_is_parallel_decode_supported', return_value=True)
+        pool_spy = mocker.spy(geom_utils, 'ProcessPoolExecutor')
+
+        # Given
+        geom = pd.Series(['SRID=4326;POINT (0 0)', None, 'SRID=4326;POINT (1 1)', ''], index=[2, 2, 1, 0])
+
+        # When
+        decoded_geom = decode_geometry(geom, n_jobs=2)
+
+        # Then
+        pool_spy.assert_called_once_with(max_workers=2)
+        assert decoded_geom.index.tolist() == [2, 2, 1, 0]
+        assert decoded_geom.tolist() == [Point([0, 0]), None, Point([1, 1]), None]
+
+    def test_decode_geometry_n_jobs_small_input(self, mocker):
+        mocker.patch.object(geom_utils, '_is_parallel_decode_supported', return_value=True)
+        pool_spy = mocker.spy(geom_utils, 'ProcessPoolExecutor')
+
+        # Given
+        geom = pd.Series(['POINT (0 0)', 'POINT (1 1)'])
+
+        # When
+        decoded_geom = decode_geometry(geom, n_jobs=2)
+
+        # Then
+        pool_spy.assert_not_called()
+        assert decoded_geom.tolist() == [Point([0, 0]), Point([1, 1])]
+
+    def test_decode_geometry_mixed_encoding(self):
+        # Given
+        geom = pd.Series([
+            'POINT (0 0)',
+            None,
+            '0101000000000000000048934000000000009DB640',
+            'SRID=4326;POINT (1 1)',
+            b'0101000000000000000048934000000000009DB640',
+            Point([2, 2]),
+            ''
+        ], index=[5, 5, 4, 3, 2, 1, 0])
+
+        # When
+        decoded_geom = decode_geometry(geom, mixed_encoding=True)
+
+        # Then
+        assert decoded_geom.index.tolist() == [5, 5, 4, 3, 2, 1, 0]
+        assert decoded_geom.tolist() == [
+            Point([0, 0]), None, Point([1234, 5789]), Point([1, 1]), Point([1234, 5789]), Point([2, 2]), None
+        ]
+
+    def test_set_geometry_mixed_encoding(self):
+        gdf = gpd.GeoDataFrame({'geom': ['POINT(0 0)', '0101000000000000000048934000000000009DB640']})
+
+        set_geometry(gdf, 'geom', inplace=True, mixed_encoding=True)
+
+        assert gdf.geometry.tolist() == [Point([0, 0]), Point([1234, 5789])]
+
+    def test_set_geometry_wrong_n_jobs(self):
+        gdf = gpd.GeoDataFrame({'geom': ['POINT(0 0)']})
+
+        with pytest.raises(ValueError) as e:
+            set_geometry(gdf, 'geom', n_jobs=0)
+
+        assert str(e.value) == '`n_jobs` parameter must be an integer > 0'
+
+    def test_set_lazy_geometry(self):
+        # Given
+        df = pd.DataFrame({'A': [1, 2, 3], 'geom': self.geom}, index=[2, 2, 1])
+
+        # When
+        gdf = set_lazy_geometry(df, 'geom', crs='epsg:4326')
+
+        # Then
+        assert isinstance(gdf, LazyGeoDataFrame)
+        assert not gdf.is_decoded
+        assert gdf['A'].tolist() == [1, 2, 3]
+        assert gdf.geometry.tolist() == self.geometry.tolist()
+        assert gdf.geometry.index.tolist() == [2, 2, 1]
+        assert gdf.is_decoded
+        assert gdf.crs == 'epsg:4326'
+
+    def test_set_lazy_geometry_stores_wkb_bytes(self):
+        df = pd.DataFrame({'geom': [self.geom[0], None]})
+
+        gdf = set_lazy_geometry(df, 'geom')
+
+        assert gdf.dtypes['geom'] == object
+        assert gdf.iloc[:, 0].tolist() == [bytes.fromhex(self.geom[0]), None]
+
+    def test_set_lazy_geometry_wrong_column(self):
+        with pytest.raises(ValueError) as e:
+            set_lazy_geometry(pd.DataFrame({'A': [1]}), 'geom')
+
+        assert str(e.value) == 'Column "geom" does not exist.'
+
+    def test_lazy_geodataframe_slices(self):
+        # Given
+        gdf = set_lazy_geometry(pd.DataFrame({'A': [1, 2, 3], 'geom': self.geom}), 'geom')
+
+        # When
+        sliced = gdf[gdf['A'] > 1]
+        bounds = sliced.total_bounds
+
+        # Then
+        assert isinstance(sliced, LazyGeoDataFrame)
+        assert bounds.tolist() == [10, 15, 20, 30]
+        assert sliced.is_decoded
+        assert not gdf.is_decoded
+        assert isinstance(gdf[['A', 'geom']], LazyGeoDataFrame)
+
+    def test_lazy_geodataframe_null_geom_value(self):
+        gdf = set_lazy_geometry(pd.DataFrame({'geom': [None, self.geom[1]]}), 'geom', null_geom_value=Point([1, 1]))
+
+        assert gdf.geometry.tolist() == [Point([1, 1]), Point([10, 15])]
+
     def test_detect_encoding_type_shapely(self):
         enc_type = detect_encoding_type(Point(1234, 5789))
         assert enc_type == ENC_SHAPELY
@@ -84,6 +237,50 @@ class TestGeomUtils(object):
         enc_type = detect_encoding_type('SRID=4326;POINT (1234 5789)')  # ext
         assert enc_type == ENC_EWKT
 
+    def test_detect_encoding_type_long_geometry(self, mocker):
+        mocker.patch.object(geom_utils, 'DETECT_PREFIX_LENGTH', 4)
+
+        assert detect_encoding_type('0101' + 'x' * 10) == ENC_WKB_HEX
+        assert detect_encoding_type(b'0101' + b'x' * 10) == ENC_WKB_BHEX
+        assert detect_encoding_type('SRID=4326;POINT (1234 5789)') == ENC_WKT
+
+    def test_detect_encoding_type_empty(self):
+        assert detect_encoding_type('') is None
+        assert detect_encoding_type('SRID=4326;') is None
+
+    def test_detect_encoding_types(self):
+        enc_types = detect_encoding_types(pd.Series([
+            'POINT (1234 5789)',
+            None,
+            '0101000000000000000048934000000000009DB640',
+            b'\x01\x01\x00\x00\x00\x00\x00\x00\x00\x00H\x93@\x00\x00\x00\x00\x00\x9d\xb6@',
+            ''
+        ]))
+
+        assert enc_types.tolist() == [ENC_WKT, None, ENC_WKB_HEX, ENC_WKB, None]
+
+    def test_detect_encoding_types_as_detect_encoding_type(self, mocker):
+        mocker.patch.object(geom_utils, 'DETECT_PREFIX_LENGTH', 12)
+        values = [
+            'POINT (1234 5789)',
+            'SRID=4326;POINT (1234 5789)',
+            'SRID=4326;',
+            'SRID=4326123;POINT (1234 5789)',
+            '0101000020E6100000000000000048934000000000009DB640',
+            '0101000000000000xyz',
+            b'0101000000000000000048934000000000009DB640',
+            b'\x01\x01\x00\x00\x00\x00\x00\x00\x00\x00H\x93@\x00\x00\x00\x00\x00\x9d\xb6@',
+            b'\xff\xfe',
+            Point(1234, 5789),
+            1234
+        ]
+
+        enc_types = detect_encoding_types(pd.Series(values))
+
+        assert enc_types.tolist() == [detect_encoding_type(value) for value in values]
+        assert enc_types.tolist() == [ENC_WKT, ENC_EWKT, None, ENC_WKT, ENC_WKB_HEX, ENC_WKB_HEX,
+                                      ENC_WKB_BHEX, ENC_WKB, ENC_WKB, ENC_SHAPELY, None]
+
     def test_decode_geometry_shapely(self):
         expected_geom = Point(1234, 5789)
         geom = decode_geometry_item(Point(1234, 5789), ENC_SHAPELY)
@@ -127,3 +324,72 @@ class TestGeomUtils(object):
         geom = decode_geometry_item('SRID=4326;POINT (1234 5789)', ENC_EWKT)  # ext
         assert lgeos.GEOSGetSRID(geom._geom) == 4326
         assert geom.wkt == 'POINT (1234 5789)'
+
+    def test_encode_geometries_ewkb(self):
+        geometry = gpd.GeoSeries([Point([0, 0]), None, Point([1, 1, 1])], index=[1, 1, 2])
+
+        encoded_geom = encode_geometries_ewkb(geometry)
+
+        assert encoded_geom.tolist() == [
+            '0101000020E610000000000000000000000000000000000000',
+            None,
+            '01010000A0E6100000000000000000F03F000000000000F03F000000000000F03F'
+        ]
+        assert encoded_geom.index.tolist() == [1, 1, 2]
+        assert lgeos.GEOSGetSRID(geometry[2]._geom) == 0
+
+    def test_encode_geometries_ewkb_reprojection(self):
+        # Given
+        geometry = gpd.GeoSeries([
+            Point([100000, 200000]),
+            None,
+            LineString([(0, 0), (100000, 100000)]),
+            Point([0, 0]).buffer(1000, 2),
+            MultiPolygon([Point([500000, 500000]).buffer(10, 1), Point([0, 0]).buffer(1, 1)])
+        ], crs='EPSG:3857', index=[2, 2, 1, 0, 0])
+
+        # When
+        encoded_geom = encode_geometries_ewkb(geometry)
+
+        # Then
+        expected_geom = encode_geometries_ewkb(geometry.to_crs(epsg=4326))
+        assert encoded_geom.index.tolist() == [2, 2, 1, 0, 0]
+        assert encoded_geom.iloc[1] is None
+        for encoded, expected in zip(encoded_geom.dropna(), expected_geom.dropna()):
+            assert encoded[:18] == expected[:18]
+            assert wkb.loads(encoded, hex=True).equals_exact(wkb.loads(expected, hex=True), 1e-9)
+        assert geometry.iloc[0] == Point([100000, 200000])
+
+    def test_encode_geometries_ewkb_reprojection_z(self):
+        geometry = gpd.GeoSeries([Point([100000, 100000, 3])], crs='EPSG:3857')
+
+        encoded_geom = encode_geometries_ewkb(geometry)
+
+        assert encoded_geom.tolist() == encode_geometries_ewkb(geometry.to_crs(epsg=4326)).tolist()
+
+    def test_is_reprojection_needed(self):
+        for crs in ['epsg:4326', 'EPSG:4326', '+init=epsg:4326', 'OGC:CRS84', None]:
+            assert not is_reprojection_needed(gpd.GeoSeries([Point([0, 0])], crs=crs))
+
+        assert is_reprojection_needed(gpd.GeoSeries([Point([0, 0])], crs='epsg:3857'))
+
+    def test_get_transformer_cached(self):
+        assert get_transformer('epsg:3857', 4326) is get_transformer('epsg:3857', 4326)
+
+    def test_encode_geometries_ewkb_without_geoseries_to_wkb(self, mocker):
+        # GeoSeries.to_wkb is not available in geopandas < 0.9
+        mocker.patch.object(gpd.GeoSeries, 'to_wkb', side_effect=AttributeError)
+        geometry = gpd.GeoSeries([Point([0, 1]), None], crs='epsg:4326')
+
+        encoded_geom = encode_geometries_ewkb(geometry)
+
+        assert encoded_geom.tolist() == ['0101000020E61000000000000000000000000000000000F03F', None]
+
+    def test_encode_geometries_ewkb_big_endian(self, mocker):
+        mocker.patch('cartoframes.utils.geom_utils.to_wkb', return_value=np.array([
+            bytes.fromhex('00000000013FF00000000000004000000000000000')
+        ], dtype=object))
+
+        encoded_geom = encode_geometries_ewkb(self.geometry[:1])
+
+        assert encoded_geom.tolist() == ['0020000001000010E63FF00000000000004000000000000000']